@@ -2,26 +2,183 @@
 from __future__ import annotations
 
 import argparse
+import importlib.util
 import json
 import os
+import shutil
+import struct
+import subprocess
+import tempfile
 import zipfile
-from typing import List
+import zlib
+from bisect import bisect_left
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from itertools import compress, repeat
+from operator import and_
+from dataclasses import dataclass, field
+from typing import BinaryIO, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import orjson
+except ImportError:  # optional: faster ground-truth serialisation
+    orjson = None  # type: ignore[assignment]
 
 from generators import app_logs, infra_metrics, network_metrics, network_events, trace_spans, tso_calls, txn_facts
 from generators.service_metrics import ServiceMetricAggregator, SERVICE_METRIC_HEADERS
+from generators.txn_facts import IMPACTED_TYPE_SET
 from utils import (
-    CsvWriter,
+    ZIP_PART_SUFFIX,
+    OUTPUT_FORMATS,
+    TableWriter,
     DatasetConfig,
     RandomGenerator,
+    Row,
     RowCounter,
+    open_table_writer,
+    write_table_to_path,
     ensure_dir,
-    isoformat,
+    isoformat_ms,
+    isoformat_us,
     DATASET_NAME,
     START_TS,
     END_TS,
 )
 from validation import Validator
 
+FACT_BATCH_SIZE = 4096
+
+
+@dataclass
+class LatencyStats:
+    """Running dependency latency sum, count and timeouts for one slice of impacted traffic."""
+
+    total: float = 0.0
+    count: int = 0
+    timeouts: int = 0
+
+    def add(self, total: float, count: int, timeouts: int) -> None:
+        self.total += total
+        self.count += count
+        self.timeouts += timeouts
+
+    @property
+    def mean(self) -> float:
+        return self.total / max(1, self.count)
+
+    @property
+    def timeout_rate(self) -> float:
+        return self.timeouts / max(1, self.count)
+
+
+def accumulate_impacted(
+    dep_latency: List[float],
+    burst_mask: List[bool],
+    timeout_mask: List[bool],
+    burst: LatencyStats,
+    base: LatencyStats,
+) -> None:
+    """Fold one chunk of impacted-flow columns into the burst and baseline running stats."""
+    base_mask = [not flag for flag in burst_mask]
+    burst_n = sum(burst_mask)
+    burst_to = sum(map(and_, burst_mask, timeout_mask))
+    burst.add(sum(compress(dep_latency, burst_mask)), burst_n, burst_to)
+    base.add(sum(compress(dep_latency, base_mask)), len(dep_latency) - burst_n, sum(timeout_mask) - burst_to)
+
+
+def emit_fact_tables(
+    fact: txn_facts.TransactionFact,
+    rng: RandomGenerator,
+    log_rows: List[Row],
+    span_rows: List[Row],
+    txn_rows: Optional[List[Row]],
+) -> None:
+    """Format the app log, trace span and (optionally) txn fact rows for one fact back to back.
+
+    Fields shared across tables, such as the formatted start timestamp, are computed once.
+    """
+    start_iso = isoformat_us(fact.start_us)
+    app_logs.format_fact_logs(fact, rng, log_rows)
+    trace_spans.format_fact_spans(fact, rng, span_rows, start_iso)
+    if txn_rows is not None:
+        txn_rows.append(txn_facts.txn_fact_row(fact, start_iso))
+
+
+@dataclass
+class BatchFactBuffer:
+    """Collects per-fact table rows so each writer is flushed with one writerows call per chunk."""
+
+    app_log_writer: TableWriter
+    trace_writer: TableWriter
+    txn_fact_writer: Optional[TableWriter]
+    rng: RandomGenerator
+    row_counter: RowCounter
+    tso_generator: Optional[tso_calls.TSOCallGenerator] = None
+    capacity: int = FACT_BATCH_SIZE
+    pending: int = 0
+    log_rows: List[Row] = field(default_factory=list)
+    span_rows: List[Row] = field(default_factory=list)
+    txn_rows: List[Row] = field(default_factory=list)
+    facts: List[txn_facts.TransactionFact] = field(default_factory=list)
+    dep_latency: List[float] = field(default_factory=list)
+    burst_mask: List[bool] = field(default_factory=list)
+    timeout_mask: List[bool] = field(default_factory=list)
+    burst_stats: LatencyStats = field(default_factory=LatencyStats)
+    base_stats: LatencyStats = field(default_factory=LatencyStats)
+
+    def add(self, fact: txn_facts.TransactionFact) -> None:
+        emit_fact_tables(fact, self.rng, self.log_rows, self.span_rows, self.txn_rows if self.txn_fact_writer else None)
+        if fact.makes_cross_region_call and fact.region == "central" and fact.transaction_type in IMPACTED_TYPE_SET:
+            self.dep_latency.append(fact.dependency_latency_ms)
+            self.burst_mask.append(fact.impacted_by_primary)
+            self.timeout_mask.append(fact.final_status == "timeout")
+        if self.tso_generator:
+            self.facts.append(fact)
+        self.pending += 1
+        if self.pending >= self.capacity:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self.pending:
+            return
+        if self.tso_generator:
+            # TSO calls draw from their own stream, so handling them per chunk keeps the output.
+            self.tso_generator.process_facts(self.facts)
+            self.facts.clear()
+        # Row counts are taken once per chunk rather than incremented per fact.
+        self.app_log_writer.write_rows(self.log_rows)
+        self.trace_writer.write_rows(self.span_rows)
+        chunk_counts = {"app_logs": len(self.log_rows), "trace_spans": len(self.span_rows)}
+        if self.txn_fact_writer:
+            self.txn_fact_writer.write_formatted(self.txn_rows, txn_facts.TXN_FACT_CSV_LINE)
+            chunk_counts["txn_facts"] = len(self.txn_rows)
+        self.row_counter.increment_many(chunk_counts)
+        self.log_rows.clear()
+        self.span_rows.clear()
+        if self.dep_latency:
+            accumulate_impacted(self.dep_latency, self.burst_mask, self.timeout_mask, self.burst_stats, self.base_stats)
+        self.txn_rows.clear()
+        self.dep_latency.clear()
+        self.burst_mask.clear()
+        self.timeout_mask.clear()
+        self.pending = 0
+
+
+class InlineExecutor(Executor):
+    """Executor that runs each task immediately in the calling process (``--workers 0``)."""
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        future: Future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as exc:
+            future.set_exception(exc)
+        return future
+
+
+def make_executor(workers: Optional[int]) -> Executor:
+    """Process pool with ``workers`` processes (``None``: one per CPU), or in-process for ``0``."""
+    return InlineExecutor() if workers == 0 else ProcessPoolExecutor(max_workers=workers)
+
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Generate synthetic Fiber SQS observability dataset")
@@ -33,10 +190,75 @@ def parse_args() -> argparse.Namespace:
     zip_group = parser.add_mutually_exclusive_group()
     zip_group.add_argument("--zip", dest="zip_output", action="store_true", default=True)
     zip_group.add_argument("--no-zip", dest="zip_output", action="store_false")
-    return parser.parse_args()
+    parser.add_argument(
+        "--no-intermediate",
+        dest="stream_zip",
+        action="store_true",
+        help="Deflate CSV tables straight into the zip instead of writing plain CSVs first (requires --zip)",
+    )
+    parser.add_argument(
+        "--zip-backend",
+        choices=ZIP_BACKENDS,
+        default="zlib",
+        help=(
+            "DEFLATE implementation used when packaging: stdlib zlib, python-isal, or the pigz binary "
+            "(--no-intermediate supports zlib only)"
+        ),
+    )
+    parser.add_argument(
+        "--format",
+        dest="output_format",
+        choices=OUTPUT_FORMATS,
+        default="csv",
+        help="Table file format; parquet writes ZSTD-compressed columnar files and requires pyarrow",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=3,
+        help="Worker processes for the independent tables and zip compression; 0 runs everything in-process",
+    )
+    args = parser.parse_args()
+    if args.workers < 0:
+        parser.error("--workers must be >= 0")
+    if args.stream_zip and not args.zip_output:
+        parser.error("--no-intermediate requires --zip")
+    if args.stream_zip and args.output_format != "csv":
+        parser.error("--no-intermediate only applies to --format=csv")
+    if args.stream_zip and args.zip_backend != "zlib":
+        parser.error("--no-intermediate deflates tables with zlib; --zip-backend must be zlib")
+    if args.output_format == "parquet" and importlib.util.find_spec("pyarrow") is None:
+        parser.error("--format=parquet requires the pyarrow package")
+    if args.zip_backend == "isal" and importlib.util.find_spec("isal") is None:
+        parser.error("--zip-backend=isal requires the isal package (pip install isal)")
+    if args.zip_backend == "pigz" and shutil.which("pigz") is None:
+        parser.error("--zip-backend=pigz requires pigz on PATH")
+    return args
 
 
-def write_dataset_readme(output_dir: str) -> None:
+def check_cross_region_fact(fact: txn_facts.TransactionFact, circuit_map) -> None:
+    """Raise a descriptive error for a cross-region fact whose circuit does not match its route."""
+    if not fact.circuit_id:
+        raise ValueError(f"Cross-region fact missing circuit_id: {fact.transaction_id}")
+    circuit = circuit_map.get(fact.circuit_id)
+    if not circuit:
+        raise ValueError(f"Cross-region fact references unknown circuit_id={fact.circuit_id}")
+    src_region, dst_region, _sig = circuit
+    if src_region != fact.region or dst_region != (fact.dependency_region or ""):
+        raise ValueError(
+            "Cross-region fact circuit mismatch: "
+            f"txn={fact.transaction_id} "
+            f"fact=({fact.region}->{fact.dependency_region}) "
+            f"circuit=({src_region}->{dst_region})"
+        )
+
+
+# File extension and ClickHouse input format of each ``--format``, for the load instructions.
+README_LOAD_FORMATS = {"csv": ("csv", "CSVWithNames"), "parquet": ("parquet", "Parquet")}
+
+
+def write_dataset_readme(output_dir: str, output_format: str = "csv") -> str:
+    extension, clickhouse_format = README_LOAD_FORMATS[output_format]
     readme_path = os.path.join(output_dir, "README.md")
     contents = "# Fiber SQS Cross-Region Latency Dataset\n\n"
     contents += "## Scenario\n"
@@ -54,7 +276,7 @@ def write_dataset_readme(output_dir: str) -> None:
         "Engineers must disentangle this from a Central CPU spike and a minor West deployment blip."
     )
     contents += "\n\n## Loading into ClickHouse\n"
-    contents += """Example using `clickhouse-client`:\n\n````bash\nfor file in data/clickhouse-*.csv; do\n  table=$(basename "$file" | sed 's/clickhouse-//; s/.csv//')\n  clickhouse-client --query "DROP TABLE IF EXISTS $table"\n  clickhouse-client --query "CREATE TABLE $table (\n    -- define schema matching README requirements\n  ) ENGINE = MergeTree ORDER BY tuple()"\n  clickhouse-client --query "INSERT INTO $table FORMAT CSVWithNames" < "$file"\ndone\n````\n"""
+    contents += f"""Example using `clickhouse-client`:\n\n````bash\nfor file in data/clickhouse-*.{extension}; do\n  table=$(basename "$file" | sed 's/clickhouse-//; s/.{extension}//')\n  clickhouse-client --query "DROP TABLE IF EXISTS $table"\n  clickhouse-client --query "CREATE TABLE $table (\n    -- define schema matching README requirements\n  ) ENGINE = MergeTree ORDER BY tuple()"\n  clickhouse-client --query "INSERT INTO $table FORMAT {clickhouse_format}" < "$file"\ndone\n````\n"""
     contents += "\n## Realism Notes\n"
     contents += "- Diurnal traffic drivers shape txn volumes and retries\n"
     contents += "- Heavy-tailed latency + retry amplification during bursts\n"
@@ -63,6 +285,67 @@ def write_dataset_readme(output_dir: str) -> None:
     contents += "- Alerts mix true/false positives to mimic noisy operations\n"
     with open(readme_path, "w", encoding="utf-8") as fh:
         fh.write(contents)
+    return readme_path
+
+
+CALL_DETAILS_PLACEHOLDER = "__call_details__"
+
+
+# Records encoded per orjson call when streaming call_details.
+CALL_DETAILS_CHUNK = 65536
+
+
+def _write_call_details(fh, records: Iterable[tso_calls.TSOCallRecord], indent: str) -> None:
+    """Write ``records`` as the JSON list ``json.dump(indent=2)`` would emit at ``indent``."""
+    item_indent = indent + "  "
+    field_indent = item_indent + "  "
+    separator = "[\n"
+    for rec in records:
+        true_id = json.dumps(rec.true_transaction_id)
+        # Clean calls emit the fact's own id object, so equality is an identity hit and the
+        # encoded id is reused.
+        if rec.emitted_transaction_id == rec.true_transaction_id:
+            emitted_id = true_id
+        else:
+            emitted_id = json.dumps(rec.emitted_transaction_id)
+        fh.write(
+            f"{separator}{item_indent}{{\n"
+            f'{field_indent}"call_id": {json.dumps(rec.call_id)},\n'
+            f'{field_indent}"true_transaction_id": {true_id},\n'
+            f'{field_indent}"emitted_transaction_id": {emitted_id},\n'
+            f'{field_indent}"noise_type": {json.dumps(rec.noise_type)},\n'
+            f'{field_indent}"delay_minutes": {int(rec.delay_minutes)}\n'
+            f"{item_indent}}}"
+        )
+        separator = ",\n"
+    fh.write("[]" if separator == "[\n" else f"\n{indent}]")
+
+
+def _write_call_details_orjson(fh, stats: tso_calls.TSOStats, indent: str) -> None:
+    """``_write_call_details`` for ``stats``' calls, encoding each chunk with one ``orjson.dumps``."""
+    newline = "\n" + indent
+    separator = "["
+    columns = (stats.call_ids, stats.true_transaction_ids, stats.emitted_transaction_ids, stats.noise_types)
+    for lo in range(0, len(stats.call_ids), CALL_DETAILS_CHUNK):
+        hi = lo + CALL_DETAILS_CHUNK
+        chunk = [
+            {
+                "call_id": call_id,
+                "true_transaction_id": true_id,
+                "emitted_transaction_id": emitted_id,
+                "noise_type": noise_type,
+                "delay_minutes": delay,
+            }
+            for call_id, true_id, emitted_id, noise_type, delay in zip(
+                *[column[lo:hi] for column in columns], stats.delay_minutes[lo:hi]
+            )
+        ]
+        # orjson's indented list is stripped of its brackets and shifted to the placeholder's
+        # depth so the chunks join into one list.
+        body = orjson.dumps(chunk, option=orjson.OPT_INDENT_2).decode("utf-8")
+        fh.write(separator + body[1:-2].replace("\n", newline))
+        separator = ","
+    fh.write("[]" if separator == "[" else newline + "]")
 
 
 def write_ground_truth(
@@ -72,7 +355,7 @@ def write_ground_truth(
     row_counter: RowCounter,
     seed: int,
     tso_stats: tso_calls.TSOStats,
-) -> None:
+) -> str:
     gt_path = os.path.join(output_dir, "ground_truth.json")
     noise_counts = {k: tso_stats.noise_counts.get(k, 0) for k in ["clean", "missing", "fabricated", "wrong_customer"]}
     total_calls = max(1, tso_stats.rows)
@@ -80,35 +363,26 @@ def write_ground_truth(
         "total_calls": tso_stats.rows,
         "noise_counts": noise_counts,
         "noise_rates": {k: round(v / total_calls, 4) for k, v in noise_counts.items()},
-        "call_details": [
-            {
-                "call_id": rec.call_id,
-                "true_transaction_id": rec.true_transaction_id,
-                "emitted_transaction_id": rec.emitted_transaction_id,
-                "noise_type": rec.noise_type,
-                "delay_minutes": rec.delay_minutes,
-            }
-            for rec in tso_stats.call_records
-        ],
+        "call_details": CALL_DETAILS_PLACEHOLDER,
     }
     data = {
         "dataset_name": DATASET_NAME,
-        "time_range": {"start": isoformat(START_TS), "end": isoformat(END_TS)},
+        "time_range": {"start": isoformat_ms(START_TS), "end": isoformat_ms(END_TS)},
         "primary_incident": {
             "root_cause_type": "network",
             "circuit_id": incident.circuit_id,
             "src_region": incident.src_region,
             "dst_region": incident.dst_region,
-            "start": isoformat(incident.start),
-            "end": isoformat(incident.end),
-            "fix_time": isoformat(incident.fix_time),
+            "start": isoformat_ms(incident.start),
+            "end": isoformat_ms(incident.end),
+            "fix_time": isoformat_ms(incident.fix_time),
             "affected_transaction_types": txn_facts.IMPACTED_TRANSACTION_TYPES,
         },
         "confounders": [
             {
                 "name": conf.name,
-                "start": isoformat(conf.start),
-                "end": isoformat(conf.end),
+                "start": isoformat_ms(conf.start),
+                "end": isoformat_ms(conf.end),
                 "component": conf.component,
                 "region": conf.region,
                 "description": conf.description,
@@ -128,20 +402,296 @@ def write_ground_truth(
         },
         "tso_noise": tso_noise,
     }
+    if orjson is not None:
+        document = orjson.dumps(data, option=orjson.OPT_INDENT_2).decode("utf-8")
+    else:
+        document = json.dumps(data, indent=2)
+    # call_details can hold millions of records, so they are streamed into the placeholder's slot
+    # instead of being materialised as dicts and encoded along with the rest of the document.
+    prefix, suffix = document.split(json.dumps(CALL_DETAILS_PLACEHOLDER), 1)
+    last_line = prefix[prefix.rfind("\n") + 1 :]
     with open(gt_path, "w", encoding="utf-8") as fh:
-        json.dump(data, fh, indent=2)
+        fh.write(prefix)
+        indent = last_line[: len(last_line) - len(last_line.lstrip())]
+        if orjson is not None:
+            _write_call_details_orjson(fh, tso_stats, indent)
+        else:
+            _write_call_details(fh, tso_stats.call_records, indent)
+        fh.write(suffix)
+    return gt_path
+
+
+ZIP_CHUNK_BYTES = 1 << 20
+ZIP_BACKENDS = ("zlib", "isal", "pigz")
+
+
+def _raw_compressor(backend: str):
+    if backend == "isal":
+        from isal import isal_zlib
+
+        return isal_zlib.compressobj(isal_zlib.ISAL_DEFAULT_COMPRESSION, isal_zlib.DEFLATED, -15)
+    return zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+
+
+def _deflate_member(filepath: str, tmp_path: str, backend: str = "zlib") -> Tuple[int, int, int, int]:
+    """Raw-deflate ``filepath`` into ``tmp_path``.
 
+    Returns ``(crc, file_size, compress_size, offset)`` where ``offset`` is where the deflate
+    stream starts inside ``tmp_path``.
+    """
+    compressor = _raw_compressor(backend)
+    crc = 0
+    file_size = 0
+    compress_size = 0
+    with open(filepath, "rb") as src, open(tmp_path, "wb") as dst:
+        while True:
+            chunk = src.read(ZIP_CHUNK_BYTES)
+            if not chunk:
+                break
+            crc = zlib.crc32(chunk, crc)
+            file_size += len(chunk)
+            data = compressor.compress(chunk)
+            compress_size += len(data)
+            dst.write(data)
+        data = compressor.flush()
+        compress_size += len(data)
+        dst.write(data)
+    return crc, file_size, compress_size, 0
 
-def package_zip(output_dir: str) -> str:
+
+def _pigz_member(filepath: str, tmp_path: str) -> Tuple[int, int, int, int]:
+    """Gzip ``filepath`` with multi-threaded pigz and locate the raw deflate stream inside it."""
+    with open(filepath, "rb") as src, open(tmp_path, "wb") as dst:
+        subprocess.run(["pigz", "-c", "-p", str(os.cpu_count() or 1)], stdin=src, stdout=dst, check=True)
+    with open(tmp_path, "rb") as fh:
+        header = fh.read(10)
+        if header[:3] != b"\x1f\x8b\x08":
+            raise ValueError(f"pigz produced an unexpected stream for {filepath}")
+        flags = header[3]
+        if flags & 0x04:
+            (extra_len,) = struct.unpack("<H", fh.read(2))
+            fh.seek(extra_len, os.SEEK_CUR)
+        for flag in (0x08, 0x10):
+            if flags & flag:
+                while fh.read(1) not in (b"\x00", b""):
+                    pass
+        if flags & 0x02:
+            fh.seek(2, os.SEEK_CUR)
+        offset = fh.tell()
+        end = fh.seek(-8, os.SEEK_END)
+        crc, _isize = struct.unpack("<II", fh.read(8))
+    return crc, os.path.getsize(filepath), end - offset, offset
+
+
+# ZIP container records (PKWARE APPNOTE 4.3). ``zipfile`` has no public way to add a member whose
+# data is already deflated, so archives assembled from parallel-compressed streams are written
+# directly from the specification, with ZIP64 extensions for sizes and offsets past 4 GiB.
+_LOCAL_FILE_HEADER = struct.Struct("<IHHHHHIIIHH")
+_CENTRAL_DIR_HEADER = struct.Struct("<IHHHHHHIIIHHHHHII")
+_ZIP64_END_RECORD = struct.Struct("<IQHHIIQQQQ")
+_ZIP64_END_LOCATOR = struct.Struct("<IIQI")
+_END_RECORD = struct.Struct("<IHHHHIIH")
+_ZIP32_MAX = 0xFFFFFFFF
+_ZIP16_MAX = 0xFFFF
+_ZIP_VERSION = 20
+_ZIP64_VERSION = 45
+_ZIP_UNIX = 3
+_ZIP_UTF8_FLAG = 0x800
+
+
+def _dos_date_time(date_time: Tuple[int, int, int, int, int, int]) -> Tuple[int, int]:
+    year, month, day, hour, minute, second = date_time
+    return (year - 1980) << 9 | month << 5 | day, hour << 11 | minute << 5 | second // 2
+
+
+def _zip64_extra(values: Sequence[int]) -> bytes:
+    return struct.pack(f"<HH{len(values)}Q", 1, 8 * len(values), *values) if values else b""
+
+
+class DeflatedZipWriter:
+    """Write a zip archive whose members are added as already raw-deflated streams.
+
+    Each ``ZipInfo`` passed to ``add`` must carry the member's ``CRC``, ``file_size`` and
+    ``compress_size``; its ``date_time`` and ``external_attr`` are recorded as given.
+    """
+
+    def __init__(self, path: str) -> None:
+        self._fh = open(path, "wb")
+        self._central: List[bytes] = []
+
+    def __enter__(self) -> DeflatedZipWriter:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def add(self, zinfo: zipfile.ZipInfo, src: BinaryIO) -> None:
+        """Append ``zinfo.compress_size`` deflated bytes read from ``src`` as the next member."""
+        fh = self._fh
+        offset = fh.tell()
+        try:
+            name = zinfo.filename.encode("ascii")
+            flags = 0
+        except UnicodeEncodeError:
+            name = zinfo.filename.encode("utf-8")
+            flags = _ZIP_UTF8_FLAG
+        dos_date, dos_time = _dos_date_time(zinfo.date_time)
+        zip64_sizes = max(zinfo.file_size, zinfo.compress_size) >= _ZIP32_MAX
+        size_fields = (_ZIP32_MAX, _ZIP32_MAX) if zip64_sizes else (zinfo.compress_size, zinfo.file_size)
+        version = _ZIP64_VERSION if zip64_sizes or offset >= _ZIP32_MAX else _ZIP_VERSION
+        # Fields shared by the local and central headers: version needed, flags, method, time, CRC, sizes.
+        common = (version, flags, zipfile.ZIP_DEFLATED, dos_time, dos_date, zinfo.CRC, *size_fields)
+        extra = _zip64_extra([zinfo.file_size, zinfo.compress_size] if zip64_sizes else [])
+        fh.write(_LOCAL_FILE_HEADER.pack(0x04034B50, *common, len(name), len(extra)))
+        fh.write(name)
+        fh.write(extra)
+        remaining = zinfo.compress_size
+        while remaining:
+            chunk = src.read(min(ZIP_CHUNK_BYTES, remaining))
+            if not chunk:
+                raise ValueError(f"Truncated compressed stream for {zinfo.filename}")
+            fh.write(chunk)
+            remaining -= len(chunk)
+        central_values = [zinfo.file_size, zinfo.compress_size] if zip64_sizes else []
+        if offset >= _ZIP32_MAX:
+            central_values.append(offset)
+        central_extra = _zip64_extra(central_values)
+        self._central.append(
+            _CENTRAL_DIR_HEADER.pack(
+                0x02014B50,
+                _ZIP_UNIX << 8 | version,
+                *common,
+                len(name),
+                len(central_extra),
+                0,  # comment length
+                0,  # disk number
+                0,  # internal attributes
+                zinfo.external_attr,
+                min(offset, _ZIP32_MAX),
+            )
+            + name
+            + central_extra
+        )
+
+    def close(self) -> None:
+        fh = self._fh
+        if fh.closed:
+            return
+        central_offset = fh.tell()
+        for record in self._central:
+            fh.write(record)
+        central_size = fh.tell() - central_offset
+        entries = len(self._central)
+        if entries >= _ZIP16_MAX or central_offset >= _ZIP32_MAX or central_size >= _ZIP32_MAX:
+            zip64_end_offset = fh.tell()
+            fh.write(
+                _ZIP64_END_RECORD.pack(
+                    0x06064B50,
+                    _ZIP64_END_RECORD.size - 12,
+                    _ZIP_UNIX << 8 | _ZIP64_VERSION,
+                    _ZIP64_VERSION,
+                    0,
+                    0,
+                    entries,
+                    entries,
+                    central_size,
+                    central_offset,
+                )
+            )
+            fh.write(_ZIP64_END_LOCATOR.pack(0x07064B50, 0, zip64_end_offset, 1))
+        fh.write(
+            _END_RECORD.pack(
+                0x06054B50,
+                0,
+                0,
+                min(entries, _ZIP16_MAX),
+                min(entries, _ZIP16_MAX),
+                min(central_size, _ZIP32_MAX),
+                min(central_offset, _ZIP32_MAX),
+                0,
+            )
+        )
+        fh.close()
+
+
+def _append_deflated(
+    archive: DeflatedZipWriter,
+    filepath: str,
+    arcname: str,
+    tmp_path: str,
+    crc: int,
+    compress_size: int,
+    offset: int = 0,
+) -> None:
+    """Append an already-deflated member, recording what ``ZipFile.write`` records for it."""
+    zinfo = zipfile.ZipInfo.from_file(filepath, arcname)
+    zinfo.CRC = crc
+    zinfo.compress_size = compress_size
+    with open(tmp_path, "rb") as src:
+        src.seek(offset)
+        archive.add(zinfo, src)
+
+
+def _append_zip_part(archive: DeflatedZipWriter, part_path: str, arcname: str) -> None:
+    """Copy the single deflated member of a ``CsvWriter`` zip part into ``archive`` under ``arcname``."""
+    with zipfile.ZipFile(part_path) as part:
+        src_info = part.infolist()[0]
+    if src_info.compress_type != zipfile.ZIP_DEFLATED:
+        raise ValueError(f"Zip part {part_path} is not deflated")
+    zinfo = zipfile.ZipInfo(arcname, date_time=src_info.date_time)
+    zinfo.external_attr = src_info.external_attr
+    zinfo.CRC = src_info.CRC
+    zinfo.file_size = src_info.file_size
+    zinfo.compress_size = src_info.compress_size
+    with open(part_path, "rb") as src:
+        src.seek(src_info.header_offset)
+        header = _LOCAL_FILE_HEADER.unpack(src.read(_LOCAL_FILE_HEADER.size))
+        # Skip the part's own file name and extra field to reach the deflate stream.
+        src.seek(header[9] + header[10], os.SEEK_CUR)
+        archive.add(zinfo, src)
+
+
+def package_zip(
+    output_dir: str,
+    backend: str = "zlib",
+    files: Optional[Sequence[str]] = None,
+    workers: Optional[int] = None,
+) -> str:
+    """Zip ``files`` (default: everything under ``output_dir`` except existing zips)."""
     zip_path = os.path.join(output_dir, f"{DATASET_NAME}.zip")
-    with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED) as zipf:
-        for root, _dirs, files in os.walk(output_dir):
-            for file in files:
-                if file.endswith(".zip"):
-                    continue
-                filepath = os.path.join(root, file)
-                rel = os.path.relpath(filepath, output_dir)
-                zipf.write(filepath, arcname=rel)
+    if files is None:
+        files = [
+            os.path.join(root, file)
+            for root, _dirs, names in os.walk(output_dir)
+            for file in names
+            if not file.endswith(".zip")
+        ]
+    members = []
+    parts = []
+    for filepath in files:
+        if filepath.endswith(ZIP_PART_SUFFIX):
+            parts.append((filepath, os.path.relpath(filepath[: -len(ZIP_PART_SUFFIX)], output_dir)))
+            continue
+        members.append((filepath, os.path.relpath(filepath, output_dir)))
+    # DEFLATE is CPU-bound and independent per member: compress in worker processes (or with
+    # pigz, which threads internally) into scratch files, then append the raw streams
+    # sequentially in the original order with DeflatedZipWriter.
+    with tempfile.TemporaryDirectory(dir=output_dir) as scratch:
+        filepaths = [filepath for filepath, _ in members]
+        tmp_paths = [os.path.join(scratch, f"{idx}.deflate") for idx in range(len(members))]
+        if backend == "pigz":
+            results = list(map(_pigz_member, filepaths, tmp_paths))
+        else:
+            with make_executor(workers) as pool:
+                results = list(pool.map(_deflate_member, filepaths, tmp_paths, repeat(backend)))
+        with DeflatedZipWriter(zip_path) as archive:
+            for (filepath, arcname), tmp_path, (crc, _size, compress_size, offset) in zip(members, tmp_paths, results):
+                _append_deflated(archive, filepath, arcname, tmp_path, crc, compress_size, offset)
+            # Tables streamed with --no-intermediate are already deflated; copy them verbatim.
+            for part_path, arcname in parts:
+                _append_zip_part(archive, part_path, arcname)
+    for part_path, _arcname in parts:
+        os.remove(part_path)
     return zip_path
 
 
@@ -155,6 +705,10 @@ def main() -> None:
         app_log_rows=max(1, scaled_rows),
         enable_tier2=args.enable_tier2,
         zip_output=args.zip_output,
+        stream_zip=args.stream_zip,
+        zip_backend=args.zip_backend,
+        output_format=args.output_format,
+        workers=args.workers,
     )
     ensure_dir(config.output_dir)
     ensure_dir(config.data_dir)
@@ -162,34 +716,78 @@ def main() -> None:
     fact_rng = RandomGenerator(config.seed)
     table_rng = RandomGenerator(config.seed + 11)
     tso_rng = RandomGenerator(config.seed + 23)
-    network_rng = RandomGenerator(config.seed + 37)
     circuit_rng = RandomGenerator(config.seed + 51)
-    infra_rng = RandomGenerator(config.seed + 67)
-    alert_rng = RandomGenerator(config.seed + 79)
 
     incident = txn_facts.build_incident(config.seed)
     confounders = txn_facts.default_confounders()
-    regions = txn_facts.REGIONS
-    circuit_map = network_metrics.build_circuit_map(
-        incident,
-        [(src, dst) for src in regions for dst in regions if src != dst],
-        circuit_rng,
-    )
+    circuit_map = network_metrics.build_circuit_map(incident, network_metrics.REGION_PAIRS, circuit_rng)
     route_lookup = network_metrics.build_route_lookup(circuit_map)
 
-    row_counter = RowCounter({})
+    row_counter = RowCounter()
 
-    app_log_writer = CsvWriter(
+    # Circuit, host and alert tables depend only on the incident/circuit setup and have their own
+    # seeds, so they are generated in worker processes while the fact stream runs.
+    table_pool = make_executor(config.workers)
+    worker_paths = [
+        os.path.join(config.data_dir, "clickhouse-network_circuit_metrics.csv"),
+        os.path.join(config.data_dir, "clickhouse-infra_host_metrics.csv"),
+    ]
+    if config.enable_tier2:
+        worker_paths.append(os.path.join(config.data_dir, "clickhouse-network_events.csv"))
+    network_future = table_pool.submit(
+        write_table_to_path,
+        network_metrics.write_network_metrics,
+        worker_paths[0],
+        network_metrics.NETWORK_HEADERS,
+        config.seed + 37,
+        incident,
+        circuit_map,
+        zipped=config.stream_zip,
+        output_format=config.output_format,
+        collect_debug=True,
+    )
+    infra_future = table_pool.submit(
+        write_table_to_path,
+        infra_metrics.write_infra_metrics,
+        worker_paths[1],
+        infra_metrics.INFRA_HEADERS,
+        config.seed + 67,
+        infra_metrics.generate_hosts(),
+        confounders,
+        zipped=config.stream_zip,
+        output_format=config.output_format,
+    )
+    alert_future = None
+    if config.enable_tier2:
+        alert_future = table_pool.submit(
+            write_table_to_path,
+            network_events.write_network_events,
+            worker_paths[2],
+            network_events.NETWORK_EVENT_HEADERS,
+            config.seed + 79,
+            incident,
+            circuit_map,
+            zipped=config.stream_zip,
+            output_format=config.output_format,
+        )
+
+    app_log_writer = open_table_writer(
         os.path.join(config.data_dir, "clickhouse-app_logs.csv"),
         app_logs.LOG_HEADERS,
+        config.stream_zip,
+        config.output_format,
     )
-    trace_writer = CsvWriter(
+    trace_writer = open_table_writer(
         os.path.join(config.data_dir, "clickhouse-trace_spans.csv"),
         trace_spans.TRACE_HEADERS,
+        config.stream_zip,
+        config.output_format,
     )
-    tso_writer = CsvWriter(
+    tso_writer = open_table_writer(
         os.path.join(config.data_dir, "clickhouse-tso_calls.csv"),
         tso_calls.TSO_HEADERS,
+        config.stream_zip,
+        config.output_format,
     )
 
     tso_generator = tso_calls.TSOCallGenerator(tso_writer, tso_rng)
@@ -197,24 +795,21 @@ def main() -> None:
     service_agg = None
     txn_fact_writer = None
     if config.enable_tier2:
-        service_metrics_writer = CsvWriter(
+        service_metrics_writer = open_table_writer(
             os.path.join(config.data_dir, "clickhouse-service_metrics.csv"),
             SERVICE_METRIC_HEADERS,
+            config.stream_zip,
+            config.output_format,
         )
         service_agg = ServiceMetricAggregator()
-        txn_fact_writer = CsvWriter(
+        txn_fact_writer = open_table_writer(
             os.path.join(config.data_dir, "clickhouse-txn_facts.csv"),
             txn_facts.TXN_FACT_HEADERS,
+            config.stream_zip,
+            config.output_format,
         )
 
     validator = Validator()
-    trace_span_refs = 0
-    impacted_burst_latency_sum = 0.0
-    impacted_base_latency_sum = 0.0
-    burst_timeouts = 0
-    burst_count = 0
-    base_timeouts = 0
-    base_count = 0
 
     fact_stream = txn_facts.TransactionFactStream(
         config=config,
@@ -223,44 +818,19 @@ def main() -> None:
         confounders=confounders,
         circuit_routes=route_lookup,
     )
+    fact_buffer = BatchFactBuffer(
+        app_log_writer, trace_writer, txn_fact_writer, table_rng, row_counter, tso_generator=tso_generator
+    )
+
+    valid_routes = frozenset((cid, src, dst) for cid, (src, dst, _sig) in circuit_map.items())
 
     for fact in fact_stream:
-        if fact.makes_cross_region_call:
-            if not fact.circuit_id:
-                raise ValueError(f"Cross-region fact missing circuit_id: {fact.transaction_id}")
-            circuit = circuit_map.get(fact.circuit_id)
-            if not circuit:
-                raise ValueError(f"Cross-region fact references unknown circuit_id={fact.circuit_id}")
-            src_region, dst_region, _sig = circuit
-            if src_region != fact.region or dst_region != (fact.dependency_region or ""):
-                raise ValueError(
-                    "Cross-region fact circuit mismatch: "
-                    f"txn={fact.transaction_id} "
-                    f"fact=({fact.region}->{fact.dependency_region}) "
-                    f"circuit=({src_region}->{dst_region})"
-                )
-        log_rows = app_logs.write_fact_logs(fact, app_log_writer, table_rng)
-        row_counter.increment("app_logs", log_rows)
-        span_rows = trace_spans.write_fact_spans(fact, trace_writer, table_rng)
-        row_counter.increment("trace_spans", span_rows)
-        trace_span_refs += span_rows
-        tso_generator.process_fact(fact)
+        if fact.makes_cross_region_call and (fact.circuit_id, fact.region, fact.dependency_region) not in valid_routes:
+            check_cross_region_fact(fact, circuit_map)
+        fact_buffer.add(fact)
         if service_agg:
             service_agg.add_fact(fact)
-        if txn_fact_writer:
-            txn_fact_writer.write_row(txn_facts.txn_fact_row(fact))
-            row_counter.increment("txn_facts", 1)
-        if fact.makes_cross_region_call and fact.region == "central" and fact.transaction_type in txn_facts.IMPACTED_TRANSACTION_TYPES:
-            if fact.impacted_by_primary:
-                impacted_burst_latency_sum += fact.dependency_latency_ms
-                burst_count += 1
-                if fact.final_status == "timeout":
-                    burst_timeouts += 1
-            else:
-                impacted_base_latency_sum += fact.dependency_latency_ms
-                base_count += 1
-                if fact.final_status == "timeout":
-                    base_timeouts += 1
+    fact_buffer.flush()
 
     tso_stats = tso_generator.finalize()
     row_counter.increment("tso_calls", tso_stats.rows)
@@ -275,82 +845,85 @@ def main() -> None:
     app_log_writer.close()
     trace_writer.close()
     tso_writer.close()
+    # Table files in the order they are packaged: in-process tables first, then worker tables.
+    table_files = [app_log_writer.path, trace_writer.path, tso_writer.path]
+    if service_metrics_writer:
+        table_files.append(service_metrics_writer.path)
+    if txn_fact_writer:
+        table_files.append(txn_fact_writer.path)
 
-    network_writer = CsvWriter(
-        os.path.join(config.data_dir, "clickhouse-network_circuit_metrics.csv"),
-        network_metrics.NETWORK_HEADERS,
-    )
-    network_rows, metrics_debug = network_metrics.write_network_metrics(network_writer, network_rng, incident, circuit_map)
-    network_writer.close()
+    (network_rows, metrics_debug), network_path = network_future.result()
     row_counter.increment("network_circuit_metrics", network_rows)
-
-    infra_writer = CsvWriter(
-        os.path.join(config.data_dir, "clickhouse-infra_host_metrics.csv"),
-        infra_metrics.INFRA_HEADERS,
-    )
-    hosts = infra_metrics.generate_hosts()
-    infra_rows, cpu_debug = infra_metrics.write_infra_metrics(infra_writer, infra_rng, hosts, confounders)
-    infra_writer.close()
+    table_files.append(network_path)
+    (infra_rows, cpu_debug), infra_path = infra_future.result()
     row_counter.increment("infra_host_metrics", infra_rows)
-
-    if config.enable_tier2:
-        alert_writer = CsvWriter(
-            os.path.join(config.data_dir, "clickhouse-network_events.csv"),
-            network_events.NETWORK_EVENT_HEADERS,
-        )
-        alert_stats = network_events.write_network_events(alert_writer, alert_rng, incident, circuit_map)
-        alert_writer.close()
+    table_files.append(infra_path)
+    if alert_future:
+        alert_stats, alert_path = alert_future.result()
         row_counter.increment("network_events", alert_stats["rows"])
+        table_files.append(alert_path)
+    table_pool.shutdown()
 
+    trace_span_refs = row_counter.get("trace_spans")
     validator.check_referential_integrity(
         tso_refs=tso_stats.non_empty_refs,
         tso_matches=tso_stats.matches,
         trace_refs=trace_span_refs,
         trace_matches=trace_span_refs,
     )
-    burst_latency_avg = impacted_burst_latency_sum / max(1, burst_count)
-    base_latency_avg = impacted_base_latency_sum / max(1, base_count)
-    burst_timeout_rate = burst_timeouts / max(1, burst_count)
-    base_timeout_rate = base_timeouts / max(1, base_count)
-    incident_metrics = metrics_debug.get(incident.circuit_id, [])
+    burst_stats = fact_buffer.burst_stats
+    base_stats = fact_buffer.base_stats
+    incident_metrics = metrics_debug.get(incident.circuit_id)
     if incident_metrics:
-        burst_values = [m["rtt_ms"] for m in incident_metrics if m.get("multiplier", 1.0) > 1.0]
-        base_values = [m["rtt_ms"] for m in incident_metrics if m.get("multiplier", 1.0) == 1.0]
+        rtt_values = incident_metrics["rtt_ms"]
+        burst_mask = [multiplier > 1.0 for multiplier in incident_metrics["multiplier"]]
+        base_mask = [multiplier == 1.0 for multiplier in incident_metrics["multiplier"]]
+        burst_values = list(compress(rtt_values, burst_mask))
+        base_values = list(compress(rtt_values, base_mask))
         network_rtt_burst = max(burst_values) if burst_values else (base_values[0] if base_values else 1.0)
         network_rtt_base = min(base_values) if base_values else (burst_values[0] if burst_values else 1.0)
     else:
         network_rtt_burst = 1.0
         network_rtt_base = 1.0
     validator.check_incident_coherence(
-        burst_latency_avg,
-        base_latency_avg,
-        burst_timeout_rate,
-        base_timeout_rate,
+        burst_stats.mean,
+        base_stats.mean,
+        burst_stats.timeout_rate,
+        base_stats.timeout_rate,
         network_rtt_burst,
         network_rtt_base,
     )
     cpu_peak = cpu_debug.get("central", {}).get("max", 0.0)
     cpu_window = next((conf for conf in confounders if conf.name == "central_cpu_spike"), None)
     if incident_metrics and cpu_window:
-        cpu_window_spikes = [
-            m.get("multiplier", 1.0)
-            for m in incident_metrics
-            if cpu_window.start <= m["timestamp"] < cpu_window.end
-        ]
+        # Samples are in timestamp order, so the CPU window is a contiguous slice.
+        timestamps = incident_metrics["timestamp"]
+        lo = bisect_left(timestamps, cpu_window.start)
+        hi = bisect_left(timestamps, cpu_window.end)
+        cpu_window_spikes = incident_metrics["multiplier"][lo:hi]
         network_peak_on_cpu = max(cpu_window_spikes) if cpu_window_spikes else 1.0
     else:
         network_peak_on_cpu = 1.0
     validator.check_confounder_separability(cpu_peak, network_peak_on_cpu)
     validation_summary = validator.summary()
     print(validation_summary)
-    with open(os.path.join(config.output_dir, "validation_summary.json"), "w", encoding="utf-8") as fh:
+    summary_path = os.path.join(config.output_dir, "validation_summary.json")
+    with open(summary_path, "w", encoding="utf-8") as fh:
         fh.write(validation_summary)
 
-    write_dataset_readme(config.output_dir)
-    write_ground_truth(config.output_dir, incident, confounders, row_counter, config.seed, tso_stats)
+    readme_path = write_dataset_readme(config.output_dir, config.output_format)
+    gt_path = write_ground_truth(config.output_dir, incident, confounders, row_counter, config.seed, tso_stats)
 
     if config.zip_output:
-        package_zip(config.output_dir)
+        package_zip(
+            config.output_dir,
+            config.zip_backend,
+            [summary_path, readme_path, gt_path, *table_files],
+            config.workers,
+        )
+        # Streamed tables only staged their zip parts under data/, which packaging consumed.
+        if config.stream_zip and not os.listdir(config.data_dir):
+            os.rmdir(config.data_dir)
 
 
 if __name__ == "__main__":
@@ -1,9 +1,8 @@
 from __future__ import annotations
 
-from datetime import timedelta
-from typing import List
+from typing import List, Optional
 
-from utils import CsvWriter, RandomGenerator, isoformat, jitter_timestamp
+from utils import RandomGenerator, Row, TableWriter, isoformat_us, jitter_us, ms_to_us
 from .txn_facts import TransactionFact
 
 
@@ -31,6 +30,14 @@ LOG_HEADERS = [
 ]
 
 
+# Fixed event offsets in microseconds; attempt N starts 50ms + 30ms * N after orchestration.
+_QUEUED_OFFSET_US = 10_000
+_ORCHESTRATION_OFFSET_US = 40_000
+_MANUAL_RETRY_OFFSET_US = 5_000
+_FIRST_ATTEMPT_OFFSET_US = 50_000
+_ATTEMPT_SPACING_US = 30_000
+
+
 def _host_for_region(region: str, rng: RandomGenerator) -> str:
     return f"fibersqs-prod-{region}-host{rng.randint(1, 48):02d}"
 
@@ -43,48 +50,70 @@ def _span_id(rng: RandomGenerator) -> str:
     return rng.hex_id("sp")
 
 
-def write_fact_logs(fact: TransactionFact, writer: CsvWriter, rng: RandomGenerator) -> int:
+def format_fact_logs(fact: TransactionFact, rng: RandomGenerator, rows: List[Row]) -> int:
+    """Append the log rows for ``fact`` to ``rows`` and return how many were added."""
     rows_written = 0
-    base_ts = fact.start_ts + timedelta(milliseconds=fact.clock_skew_ms)
-    cluster = _cluster_for_region(fact.region)
-    host = _host_for_region(fact.region, rng)
-
-    def emit(event: str, service: str, event_ts, level: str, dependency_latency=None, end_to_end=None, http_status="", error_code="", message=""):
+    # Event times are integer epoch microseconds; datetimes only exist at the fact boundary.
+    skew_us = ms_to_us(fact.clock_skew_ms)
+    base_us = fact.start_us + skew_us
+    region = fact.region
+    cluster = _cluster_for_region(region)
+    host = _host_for_region(region, rng)
+    # Per-fact constants bound once so each emitted row avoids repeated attribute lookups.
+    txid = fact.transaction_id
+    trace = fact.trace_id
+    cust = fact.customer_id
+    txtype = fact.transaction_type
+    dep_region = fact.dependency_region or ""
+    dep_service = fact.dependency_service or ""
+    circuit = fact.circuit_id or ""
+
+    def emit(
+        event: str,
+        service: str,
+        event_us: int,
+        level: str,
+        dependency_latency: Optional[float] = None,
+        end_to_end: Optional[float] = None,
+        http_status: str = "",
+        error_code: Optional[str] = "",
+        message: str = "",
+    ) -> None:
         nonlocal rows_written
-        writer.write_row(
-            [
-                isoformat(event_ts),
-                fact.region,
+        rows.append(
+            (
+                isoformat_us(event_us),
+                region,
                 cluster,
                 service,
                 host,
                 level,
-                fact.transaction_id,
-                fact.trace_id,
+                txid,
+                trace,
                 _span_id(rng),
-                fact.customer_id,
-                fact.transaction_type,
+                cust,
+                txtype,
                 event,
-                fact.dependency_region or "",
-                fact.dependency_service or "",
+                dep_region,
+                dep_service,
                 int(dependency_latency) if dependency_latency is not None else "",
                 round(end_to_end, 2) if end_to_end is not None else "",
                 http_status,
                 error_code or "",
-                fact.circuit_id or "",
+                circuit,
                 message,
-            ]
+            )
         )
         rows_written += 1
 
-    emit("received", "api", base_ts, "INFO", message="request received")
-    emit("queued", "api", jitter_timestamp(base_ts + timedelta(milliseconds=10), rng), "INFO", message="queued for orchestrator")
+    emit("received", "api", base_us, "INFO", message="request received")
+    emit("queued", "api", base_us + _QUEUED_OFFSET_US + jitter_us(rng), "INFO", message="queued for orchestrator")
 
-    orchestration_ts = jitter_timestamp(base_ts + timedelta(milliseconds=40), rng)
-    emit("orchestrated", "orchestrator", orchestration_ts, "INFO", message="routing transaction")
+    orchestration_us = base_us + _ORCHESTRATION_OFFSET_US + jitter_us(rng)
+    emit("orchestrated", "orchestrator", orchestration_us, "INFO", message="routing transaction")
 
     for attempt in range(fact.attempt_count):
-        attempt_ts = jitter_timestamp(orchestration_ts + timedelta(milliseconds=50 + attempt * 30), rng)
+        attempt_us = orchestration_us + _FIRST_ATTEMPT_OFFSET_US + attempt * _ATTEMPT_SPACING_US + jitter_us(rng)
         dep_latency = None
         if fact.makes_cross_region_call:
             dep_latency = fact.dependency_latency_ms * (1.0 + rng.uniform(-0.15, 0.15))
@@ -92,23 +121,23 @@ def write_fact_logs(fact: TransactionFact, writer: CsvWriter, rng: RandomGenerat
             emit(
                 "dependency_call",
                 "orchestrator",
-                attempt_ts,
+                attempt_us,
                 level,
                 dependency_latency=dep_latency,
                 message="dependency call",
             )
         worker_service = "worker" if attempt == fact.retry_count else "worker-retry"
         worker_delay = dep_latency if dep_latency is not None else 80
-        worker_ts = attempt_ts + timedelta(milliseconds=worker_delay)
-        emit("worker_progress", worker_service, worker_ts, "INFO", message="worker progressing")
+        worker_us = attempt_us + ms_to_us(worker_delay)
+        emit("worker_progress", worker_service, worker_us, "INFO", message="worker progressing")
 
-    completion_ts = fact.end_ts + timedelta(milliseconds=fact.clock_skew_ms)
+    completion_us = fact.end_us + skew_us
     level = "ERROR" if fact.final_status == "timeout" else "INFO"
     message = "completed" if fact.final_status.startswith("completed") else fact.final_status
     emit(
         "completed" if fact.final_status != "timeout" else "timeout",
         "api",
-        completion_ts,
+        completion_us,
         level,
         dependency_latency=fact.dependency_latency_ms if fact.makes_cross_region_call else None,
         end_to_end=fact.end_to_end_latency_ms,
@@ -121,7 +150,7 @@ def write_fact_logs(fact: TransactionFact, writer: CsvWriter, rng: RandomGenerat
         emit(
             "retry",
             "api",
-            completion_ts + timedelta(milliseconds=5),
+            completion_us + _MANUAL_RETRY_OFFSET_US,
             "WARN",
             message="queued for manual retry",
             http_status="",
@@ -130,4 +159,11 @@ def write_fact_logs(fact: TransactionFact, writer: CsvWriter, rng: RandomGenerat
     return rows_written
 
 
-__all__ = ["LOG_HEADERS", "write_fact_logs"]
+def write_fact_logs(fact: TransactionFact, writer: TableWriter, rng: RandomGenerator) -> int:
+    rows: List[Row] = []
+    rows_written = format_fact_logs(fact, rng, rows)
+    writer.write_rows(rows)
+    return rows_written
+
+
+__all__ = ["LOG_HEADERS", "format_fact_logs", "write_fact_logs"]
@@ -3,7 +3,7 @@ from __future__ import annotations
 from datetime import timedelta
 from typing import Dict, Tuple
 
-from utils import CsvWriter, IncidentWindow, RandomGenerator, isoformat, START_TS, END_TS
+from utils import IncidentWindow, RandomGenerator, TableWriter, isoformat_sec, START_TS, END_TS
 from .network_metrics import CircuitSignal
 
 NETWORK_EVENT_HEADERS = [
@@ -19,10 +19,17 @@ NETWORK_EVENT_HEADERS = [
 
 EVENT_TYPES = ["flap", "maintenance", "reroute", "packet_loss_burst"]
 SEVERITIES = ["info", "warning", "critical"]
+# Background event type -> (severity, description).
+EVENT_META: Dict[str, Tuple[str, str]] = {
+    "maintenance": ("info", "Planned maintenance window on circuit"),
+    "reroute": ("warning", "Routing policy change applied; path flaps briefly"),
+    "flap": ("warning", "Intermittent circuit flap observed"),
+    "packet_loss_burst": ("warning", "Short packet loss burst on circuit"),
+}
 
 
 def write_network_events(
-    writer: CsvWriter,
+    writer: TableWriter,
     rng: RandomGenerator,
     incident: IncidentWindow,
     circuits: Dict[str, Tuple[str, str, CircuitSignal]],
@@ -33,16 +40,16 @@ def write_network_events(
     def emit(ts, event_type: str, src: str, dst: str, circuit_id: str, severity: str, description: str) -> None:
         nonlocal rows, event_id
         writer.write_row(
-            [
+            (
                 f"EVT-{event_id:06d}",
-                isoformat(ts, ms=False),
+                isoformat_sec(ts),
                 event_type,
                 src,
                 dst,
                 circuit_id,
                 severity,
                 description,
-            ]
+            )
         )
         rows += 1
         event_id += 1
@@ -73,29 +80,20 @@ def write_network_events(
         for circuit_id, (src, dst, _sig) in circuits.items()
         if circuit_id != incident.circuit_id
     ]
+    last_minute = int((END_TS - START_TS).total_seconds() // 60) - 1
     for _ in range(10):
         circuit_id, src, dst = rng.choice(non_incident_circuits)
-        offset_minutes = rng.randint(0, int((END_TS - START_TS).total_seconds() // 60) - 1)
+        offset_minutes = rng.randint(0, last_minute)
         ts = START_TS + timedelta(minutes=offset_minutes)
         event_type = rng.choice(EVENT_TYPES)
-        if event_type == "maintenance":
-            severity = "info"
-            description = "Planned maintenance window on circuit"
-        elif event_type == "reroute":
-            severity = "warning"
-            description = "Routing policy change applied; path flaps briefly"
-        elif event_type == "flap":
-            severity = "warning"
-            description = "Intermittent circuit flap observed"
-        else:
-            severity = "warning" if rng.random() < 0.85 else "critical"
-            description = "Short packet loss burst on circuit"
-        # Avoid additional critical signals to keep the primary incident clean.
-        if severity == "critical":
-            severity = "warning"
+        severity, description = EVENT_META[event_type]
+        if event_type == "packet_loss_burst":
+            # The 15% critical roll is still drawn so the stream is unchanged, but bursts are capped
+            # at warning to keep the primary incident the only critical signal.
+            rng.random()
         emit(ts, event_type, src, dst, circuit_id, severity, description)
 
     return {"rows": rows}
 
 
-__all__ = ["NETWORK_EVENT_HEADERS", "write_network_events"]
+__all__ = ["NETWORK_EVENT_HEADERS", "EVENT_META", "write_network_events"]
@@ -1,18 +1,22 @@
 from __future__ import annotations
 
-from collections import defaultdict
 from datetime import datetime, timedelta
 from typing import Dict, Iterable, List, Sequence, Tuple
 
 from utils import (
-    CsvWriter,
+    WRITE_BATCH_ROWS,
     IncidentWindow,
     RandomGenerator,
+    Row,
+    TableWriter,
     START_TS,
     END_TS,
     daterange_minutes,
-    isoformat,
+    isoformat_sec,
 )
+from .txn_facts import REGIONS
+
+REGION_PAIRS: Tuple[Tuple[str, str], ...] = tuple((src, dst) for src in REGIONS for dst in REGIONS if src != dst)
 
 NETWORK_HEADERS = [
     "timestamp",
@@ -34,17 +38,28 @@ class CircuitSignal:
         self.base_throughput = base_throughput
 
     def sample(self, rng: RandomGenerator, multiplier: float = 1.0) -> Dict[str, float]:
-        rtt = self.base_rtt * rng.uniform(0.9, 1.1) * multiplier
-        loss = self.base_loss * rng.uniform(0.8, 1.2) * multiplier
-        retx = self.base_retx * rng.uniform(0.9, 1.3) * multiplier
-        throughput = self.base_throughput * rng.uniform(0.85, 1.1) / max(1.0, multiplier)
+        rtt, loss, retx, throughput = self.sample_values(rng.random(size=4), 0, multiplier)
         return {
-            "rtt_ms": round(rtt, 2),
-            "packet_loss_pct": round(loss, 4),
-            "retransmits_per_s": round(retx, 2),
-            "throughput_mbps": round(throughput, 2),
+            "rtt_ms": rtt,
+            "packet_loss_pct": loss,
+            "retransmits_per_s": retx,
+            "throughput_mbps": throughput,
         }
 
+    def sample_values(
+        self, draws: Sequence[float], offset: int = 0, multiplier: float = 1.0
+    ) -> Tuple[float, float, float, float]:
+        """Rounded ``(rtt, loss, retx, throughput)`` from four ``random()`` draws at ``draws[offset:]``.
+
+        Each draw is scaled exactly as ``RandomGenerator.uniform`` would, so a batch drawn with
+        ``rng.random(size=...)`` reproduces successive ``sample`` calls.
+        """
+        rtt = self.base_rtt * (0.9 + (1.1 - 0.9) * draws[offset]) * multiplier
+        loss = self.base_loss * (0.8 + (1.2 - 0.8) * draws[offset + 1]) * multiplier
+        retx = self.base_retx * (0.9 + (1.3 - 0.9) * draws[offset + 2]) * multiplier
+        throughput = self.base_throughput * (0.85 + (1.1 - 0.85) * draws[offset + 3]) / max(1.0, multiplier)
+        return round(rtt, 2), round(loss, 4), round(retx, 2), round(throughput, 2)
+
 
 def build_circuit_catalog(facts: Iterable[str], rng: RandomGenerator) -> Dict[str, CircuitSignal]:
     catalog: Dict[str, CircuitSignal] = {}
@@ -59,37 +74,74 @@ def build_circuit_catalog(facts: Iterable[str], rng: RandomGenerator) -> Dict[st
     return catalog
 
 
+def minute_window_mask(start: datetime, end: datetime, windows: Sequence[Tuple[datetime, datetime]]) -> List[bool]:
+    """Per-minute flags for ``daterange_minutes(start, end)``: whether the tick lies in any window."""
+    step = timedelta(minutes=1)
+    ticks = -(-(end - start) // step)
+    mask = [False] * ticks
+    for window_start, window_end in windows:
+        # First tick at or after each edge; clamp to the generated range.
+        lo = min(ticks, max(0, -(-(window_start - start) // step)))
+        hi = min(ticks, max(0, -(-(window_end - start) // step)))
+        mask[lo:hi] = [True] * max(0, hi - lo)
+    return mask
+
+
 def write_network_metrics(
-    writer: CsvWriter,
+    writer: TableWriter,
     rng: RandomGenerator,
     incident: IncidentWindow,
     circuits: Dict[str, Tuple[str, str, CircuitSignal]],
-) -> Tuple[int, Dict[str, List[Dict[str, float]]]]:
+    collect_debug: bool = False,
+) -> Tuple[int, Dict[str, Dict[str, list]]]:
+    """Write per-minute circuit samples.
+
+    Returns the row count and, when ``collect_debug`` is set, column lists of ``timestamp``,
+    ``rtt_ms`` and ``multiplier`` for the incident circuit so validation can scan them without
+    per-sample dicts. Otherwise the debug mapping is empty.
+    """
     rows = 0
-    metrics_debug: Dict[str, List[Dict[str, float]]] = defaultdict(list)
+    metrics_debug: Dict[str, Dict[str, list]] = {}
+    debug_ts: List[datetime] = []
+    debug_rtt: List[float] = []
+    debug_multiplier: List[float] = []
     start = START_TS
     end = END_TS
-    for ts in daterange_minutes(start, end):
-        for circuit_id, (src_region, dst_region, signal) in circuits.items():
+    batch: List[Row] = []
+    circuit_items = list(circuits.items())
+    draws_per_tick = 4 * len(circuit_items)
+    incident_cid = incident.circuit_id
+    burst_mask = minute_window_mask(start, end, incident.bursts)
+    for in_burst, ts in zip(burst_mask, daterange_minutes(start, end)):
+        ts_iso = isoformat_sec(ts)
+        # One draw per tick covers every circuit; during a burst the incident circuit's
+        # multiplier is drawn first in its slot, exactly as the per-circuit calls ordered it.
+        draws = rng.random(size=draws_per_tick + in_burst)
+        pos = 0
+        for circuit_id, (src_region, dst_region, signal) in circuit_items:
             multiplier = 1.0
-            if circuit_id == incident.circuit_id and any(s <= ts < e for s, e in incident.bursts):
-                multiplier = rng.uniform(6, 14)
-            sample = signal.sample(rng, multiplier)
-            writer.write_row(
-                [
-                    isoformat(ts, ms=False),
-                    src_region,
-                    dst_region,
-                    circuit_id,
-                    sample["rtt_ms"],
-                    sample["packet_loss_pct"],
-                    sample["retransmits_per_s"],
-                    sample["throughput_mbps"],
-                ]
-            )
-            rows += 1
-            if circuit_id == incident.circuit_id:
-                metrics_debug[circuit_id].append({"timestamp": ts, **sample, "multiplier": multiplier})
+            if in_burst and circuit_id == incident_cid:
+                multiplier = 6 + (14 - 6) * draws[pos]
+                pos += 1
+            rtt, loss, retx, throughput = signal.sample_values(draws, pos, multiplier)
+            pos += 4
+            batch.append((ts_iso, src_region, dst_region, circuit_id, rtt, loss, retx, throughput))
+            if collect_debug and circuit_id == incident_cid:
+                debug_ts.append(ts)
+                debug_rtt.append(rtt)
+                debug_multiplier.append(multiplier)
+        if len(batch) >= WRITE_BATCH_ROWS:
+            writer.write_rows(batch)
+            rows += len(batch)
+            batch = []
+    writer.write_rows(batch)
+    rows += len(batch)
+    if debug_ts:
+        metrics_debug[incident.circuit_id] = {
+            "timestamp": debug_ts,
+            "rtt_ms": debug_rtt,
+            "multiplier": debug_multiplier,
+        }
     return rows, metrics_debug
 
 
@@ -119,17 +171,30 @@ def build_circuit_map(
     return circuit_map
 
 
-def build_route_lookup(circuit_map: Dict[str, Tuple[str, str, CircuitSignal]]):
-    routes: Dict[Tuple[str, str], List[str]] = defaultdict(list)
+def build_route_lookup(
+    circuit_map: Dict[str, Tuple[str, str, CircuitSignal]],
+) -> Dict[Tuple[str, str], List[str]]:
+    """Group circuit ids by ``(src, dst)`` in first-seen order.
+
+    Route and circuit order feed ``rng.choice`` in the fact stream, so the grouping must keep
+    insertion order rather than sort.
+    """
+    routes: Dict[Tuple[str, str], List[str]] = {}
     for circuit_id, (src, dst, _signal) in circuit_map.items():
-        routes[(src, dst)].append(circuit_id)
+        group = routes.get((src, dst))
+        if group is None:
+            routes[(src, dst)] = [circuit_id]
+        else:
+            group.append(circuit_id)
     return routes
 
 
 __all__ = [
     "NETWORK_HEADERS",
+    "REGION_PAIRS",
     "CircuitSignal",
     "build_circuit_map",
+    "minute_window_mask",
     "write_network_metrics",
     "build_route_lookup",
 ]
@@ -1,10 +1,8 @@
 from __future__ import annotations
 
-from collections import defaultdict
-from dataclasses import dataclass
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Sequence, Tuple
 
-from utils import CsvWriter, isoformat
+from utils import US_PER_MINUTE, TableWriter, isoformat_sec_us
 from .txn_facts import TransactionFact
 
 SERVICE_METRIC_HEADERS = [
@@ -19,63 +17,80 @@ SERVICE_METRIC_HEADERS = [
 ]
 
 
-@dataclass
-class MetricBucket:
-    latencies: List[float]
-    requests: int
-    errors: int
-    retries: int
+class ServiceMetricAggregator:
+    """Per-minute service metric buckets stored column-wise.
 
+    ``key_to_id`` maps ``(minute, region, transaction_type)`` to a bucket id that indexes the
+    parallel ``latencies``, ``errors`` and ``retries`` columns; the request count of a bucket is
+    the length of its latency list.
+    """
 
-class ServiceMetricAggregator:
     def __init__(self) -> None:
-        self.buckets: Dict[Tuple[str, str, str], MetricBucket] = {}
+        self.key_to_id: Dict[Tuple[str, str, str], int] = {}
+        self.latencies: List[List[float]] = []
+        self.errors: List[int] = []
+        self.retries: List[int] = []
+        # Facts arrive in time order, so the previous minute's label is usually the one needed.
+        self._last_minute_us: Optional[int] = None
+        self._last_minute_iso = ""
 
     def add_fact(self, fact: TransactionFact) -> None:
-        ts = fact.start_ts.replace(second=0, microsecond=0)
-        key = (isoformat(ts, ms=False), fact.region, fact.transaction_type)
-        bucket = self.buckets.get(key)
-        if not bucket:
-            bucket = MetricBucket([], 0, 0, 0)
-            self.buckets[key] = bucket
-        bucket.latencies.append(fact.end_to_end_latency_ms)
-        bucket.requests += 1
+        minute_us = fact.start_us - fact.start_us % US_PER_MINUTE
+        if minute_us != self._last_minute_us:
+            self._last_minute_us = minute_us
+            self._last_minute_iso = isoformat_sec_us(minute_us)
+        key = (self._last_minute_iso, fact.region, fact.transaction_type)
+        bid = self.key_to_id.get(key)
+        if bid is None:
+            bid = self.key_to_id[key] = len(self.latencies)
+            self.latencies.append([])
+            self.errors.append(0)
+            self.retries.append(0)
+        self.latencies[bid].append(fact.end_to_end_latency_ms)
         if fact.retry_count > 0:
-            bucket.retries += 1
+            self.retries[bid] += 1
         if fact.final_status == "timeout":
-            bucket.errors += 1
+            self.errors[bid] += 1
 
     def percentile(self, values: List[float], perc: float) -> float:
+        return self.percentiles(values, (perc,))[0]
+
+    def percentiles(self, values: List[float], percs: Sequence[float]) -> List[float]:
+        """Nearest-rank order statistics for several ``percs`` from a single sort of ``values``."""
         if not values:
-            return 0.0
-        values = sorted(values)
-        idx = int(len(values) * perc)
-        idx = min(len(values) - 1, idx)
-        return values[idx]
+            return [0.0] * len(percs)
+        ordered = sorted(values)
+        last = len(ordered) - 1
+        return [ordered[min(last, int(len(ordered) * perc))] for perc in percs]
 
-    def write(self, writer: CsvWriter) -> int:
-        rows = 0
-        for (ts, region, txn_type), bucket in self.buckets.items():
-            req = max(1, bucket.requests)
-            p95 = self.percentile(bucket.latencies, 0.95)
-            p99 = self.percentile(bucket.latencies, 0.99)
-            error_rate = bucket.errors / req
-            retry_rate = bucket.retries / req
-            saturation = min(1.0, 0.15 + 0.7 * retry_rate + 1.0 * error_rate + 0.25 * min(1.0, p95 / 2500.0))
-            writer.write_row(
-                [
-                    ts,
-                    region,
-                    txn_type,
-                    round(bucket.requests / 60.0, 4),
-                    round(error_rate, 4),
-                    round(p95, 2),
-                    round(p99, 2),
-                    round(saturation, 4),
-                ]
+    def write(self, writer: TableWriter) -> int:
+        """Emit one row per bucket, built column by column and written with a single ``write_rows``."""
+        if not self.key_to_id:
+            return 0
+        ts_col, region_col, txn_col = zip(*self.key_to_id)
+        requests = [len(latencies) for latencies in self.latencies]
+        req = [max(1, count) for count in requests]
+        tails = [self.percentiles(latencies, (0.95, 0.99)) for latencies in self.latencies]
+        p95_col = [p95 for p95, _p99 in tails]
+        error_rate = [errors / count for errors, count in zip(self.errors, req)]
+        retry_rate = [retries / count for retries, count in zip(self.retries, req)]
+        saturation = [
+            min(1.0, 0.15 + 0.7 * retry + 1.0 * error + 0.25 * min(1.0, p95 / 2500.0))
+            for retry, error, p95 in zip(retry_rate, error_rate, p95_col)
+        ]
+        writer.write_rows(
+            zip(
+                ts_col,
+                region_col,
+                txn_col,
+                [round(count / 60.0, 4) for count in requests],
+                [round(rate, 4) for rate in error_rate],
+                [round(p95, 2) for p95 in p95_col],
+                [round(p99, 2) for _p95, p99 in tails],
+                [round(value, 4) for value in saturation],
             )
-            rows += 1
-        return rows
+        )
+        return len(requests)
 
 
 __all__ = ["SERVICE_METRIC_HEADERS", "ServiceMetricAggregator"]
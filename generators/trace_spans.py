@@ -1,8 +1,8 @@
 from __future__ import annotations
 
-from typing import Iterator
+from typing import Iterator, List, Optional
 
-from utils import CsvWriter, isoformat, RandomGenerator
+from utils import Row, TableWriter, isoformat_us, RandomGenerator
 from .txn_facts import TransactionFact
 
 TRACE_HEADERS = [
@@ -20,86 +20,107 @@ TRACE_HEADERS = [
 ]
 
 
-def span_id(rng: RandomGenerator) -> str:
-    return rng.hex_id("sp")
+def format_fact_spans(
+    fact: TransactionFact,
+    rng: RandomGenerator,
+    out: List[Row],
+    start_iso: Optional[str] = None,
+) -> int:
+    """Append the span rows for ``fact`` to ``out`` and return how many were added.
 
-
-def write_fact_spans(fact: TransactionFact, writer: CsvWriter, rng: RandomGenerator) -> int:
+    ``start_iso`` lets callers that already formatted ``fact.start_ts`` share it.
+    """
     rows = 0
-    root_span = span_id(rng)
-    writer.write_row(
-        [
-            isoformat(fact.start_ts),
-            fact.trace_id,
+    if start_iso is None:
+        start_iso = isoformat_us(fact.start_us)
+    status = "error" if fact.final_status == "timeout" else "ok"
+    trace = fact.trace_id
+    txid = fact.transaction_id
+    region = fact.region
+    e2e = fact.end_to_end_latency_ms
+    # Span ids are the only draws here, so take them in one call: root, orchestrator, worker, dependency.
+    span_ids = rng.hex_ids("sp", 4 if fact.makes_cross_region_call else 3)
+    root_span = span_ids[0]
+    out.append(
+        (
+            start_iso,
+            trace,
             root_span,
             "",
-            fact.transaction_id,
-            fact.region,
+            txid,
+            region,
             "api",
             "POST /fiber/txn",
-            round(fact.end_to_end_latency_ms, 2),
-            "error" if fact.final_status == "timeout" else "ok",
+            round(e2e, 2),
+            status,
             "",
-        ]
+        )
     )
     rows += 1
 
-    orch_span = span_id(rng)
-    writer.write_row(
-        [
-            isoformat(fact.start_ts),
-            fact.trace_id,
+    orch_span = span_ids[1]
+    out.append(
+        (
+            start_iso,
+            trace,
             orch_span,
             root_span,
-            fact.transaction_id,
-            fact.region,
+            txid,
+            region,
             "orchestrator",
             "coordinate",
-            round(fact.end_to_end_latency_ms * 0.4, 2),
+            round(e2e * 0.4, 2),
             "ok",
             "",
-        ]
+        )
     )
     rows += 1
 
-    worker_span = span_id(rng)
-    writer.write_row(
-        [
-            isoformat(fact.start_ts),
-            fact.trace_id,
+    worker_span = span_ids[2]
+    out.append(
+        (
+            start_iso,
+            trace,
             worker_span,
             orch_span,
-            fact.transaction_id,
-            fact.region,
+            txid,
+            region,
             "worker",
             "apply",
-            round(fact.end_to_end_latency_ms * 0.5, 2),
-            "error" if fact.final_status == "timeout" else "ok",
+            round(e2e * 0.5, 2),
+            status,
             "",
-        ]
+        )
     )
     rows += 1
 
     if fact.makes_cross_region_call:
-        dep_span = span_id(rng)
-        writer.write_row(
-            [
-                isoformat(fact.start_ts),
-                fact.trace_id,
+        dep_span = span_ids[3]
+        out.append(
+            (
+                start_iso,
+                trace,
                 dep_span,
                 orch_span,
-                fact.transaction_id,
-                fact.region,
+                txid,
+                region,
                 fact.dependency_service or "inventory-client",
                 "HTTP POST",
                 round(fact.dependency_latency_ms, 2),
-                "error" if fact.final_status == "timeout" else "ok",
+                status,
                 fact.circuit_id or "",
-            ]
+            )
         )
         rows += 1
 
     return rows
 
 
-__all__ = ["TRACE_HEADERS", "write_fact_spans"]
+def write_fact_spans(fact: TransactionFact, writer: TableWriter, rng: RandomGenerator) -> int:
+    out: List[Row] = []
+    rows = format_fact_spans(fact, rng, out)
+    writer.write_rows(out)
+    return rows
+
+
+__all__ = ["TRACE_HEADERS", "format_fact_spans", "write_fact_spans"]
@@ -1,13 +1,24 @@
 from __future__ import annotations
 
-from collections import deque
+from array import array
+from bisect import bisect_left
 from dataclasses import dataclass, field
 from datetime import timedelta
-import math
-from typing import Deque, Dict, List, Optional, Tuple
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
 
-from utils import CsvWriter, RandomGenerator, isoformat, END_TS
-from .txn_facts import TransactionFact, IMPACTED_TRANSACTION_TYPES
+from utils import (
+    CSV_LINE_TERMINATOR,
+    WRITE_BATCH_ROWS,
+    RandomGenerator,
+    Row,
+    TableWriter,
+    US_PER_MINUTE,
+    compact_timestamp_us,
+    isoformat_sec_us,
+    to_epoch_us,
+    END_TS,
+)
+from .txn_facts import TransactionFact, IMPACTED_TYPE_SET
 
 TSO_HEADERS = [
     "call_id",
@@ -32,18 +43,65 @@ ISSUE_NOTES = [
     "TSO call referencing long queue",
 ]
 
+ISSUE_CATEGORIES = ["slow_provisioning", "timeout", "failure"]
+RESOLUTION_CODES = ["system_resolved", "manual_intervention", "customer_callback"]
 
-@dataclass
+NOISE_TYPES = ["clean", "missing", "fabricated", "wrong_customer"]
+NOISE_CLEAN, NOISE_MISSING, NOISE_FABRICATED, NOISE_WRONG_CUSTOMER = range(len(NOISE_TYPES))
+
+# Line format for ``TableWriter.write_formatted``; issue notes never contain a comma or quote.
+TSO_CSV_LINE = "%s,%s,%s,%s,%s,%s,%s,%s,%d,%s,%s" + CSV_LINE_TERMINATOR
+
+
+@dataclass(slots=True)
 class TSOStats:
     rows: int = 0
     non_empty_refs: int = 0
     matches: int = 0
     incident_calls: int = 0
-    noise_counts: Dict[str, int] = field(default_factory=dict)
-    call_records: List["TSOCallRecord"] = field(default_factory=list)
+    # Calls per noise type, indexed by the NOISE_* ids.
+    noise_type_counts: List[int] = field(default_factory=lambda: [0] * len(NOISE_TYPES))
+    # Per-call ground truth is kept as parallel columns rather than one TSOCallRecord per call;
+    # the id columns share the string objects already held by the facts.
+    call_ids: List[str] = field(default_factory=list)
+    true_transaction_ids: List[str] = field(default_factory=list)
+    emitted_transaction_ids: List[str] = field(default_factory=list)
+    noise_types: List[str] = field(default_factory=list)
+    delay_minutes: "array[int]" = field(default_factory=lambda: array("i"))
+
+    def add_call_record(
+        self,
+        call_id: str,
+        true_transaction_id: str,
+        emitted_transaction_id: str,
+        noise_type: str,
+        delay_minutes: int,
+    ) -> None:
+        self.call_ids.append(call_id)
+        self.true_transaction_ids.append(true_transaction_id)
+        self.emitted_transaction_ids.append(emitted_transaction_id)
+        self.noise_types.append(noise_type)
+        self.delay_minutes.append(delay_minutes)
+
+    @property
+    def noise_counts(self) -> Dict[str, int]:
+        """Calls per noise type name, for the noise types that occurred."""
+        return {name: count for name, count in zip(NOISE_TYPES, self.noise_type_counts) if count}
+
+    @property
+    def call_records(self) -> Iterator["TSOCallRecord"]:
+        """The recorded calls as ``TSOCallRecord`` objects, built lazily in call order."""
+        return map(
+            TSOCallRecord,
+            self.call_ids,
+            self.true_transaction_ids,
+            self.emitted_transaction_ids,
+            self.noise_types,
+            self.delay_minutes,
+        )
 
 
-@dataclass
+@dataclass(slots=True)
 class TSOCallRecord:
     call_id: str
     true_transaction_id: str
@@ -52,170 +110,231 @@ class TSOCallRecord:
     delay_minutes: int
 
 
+# Calls are placed no later than five minutes before the end of the dataset window.
+_MAX_CALL_US = to_epoch_us(END_TS) - 5 * US_PER_MINUTE
+
+# Denominator of the integer noise rates used by ``TSOCallGenerator._clamp_target_count``.
+NOISE_RATE_SCALE = 10_000
+
+# Recent-fact buffer entries before the head index are compacted away once this many accumulate.
+BUFFER_COMPACT_THRESHOLD = 4096
+
+
 class TSOCallGenerator:
-    def __init__(self, writer: CsvWriter, rng: RandomGenerator) -> None:
+    def __init__(self, writer: TableWriter, rng: RandomGenerator) -> None:
         self.writer = writer
         self.rng = rng
         self.stats = TSOStats()
-        self.fact_buffer: Deque[Dict[str, object]] = deque()
+        # Emitted rows are buffered and written WRITE_BATCH_ROWS at a time; CSV output formats
+        # each batch as whole lines, other formats take the rows as-is.
+        self._row_buf: List[Row] = []
+        # Ring of recent fact end times (epoch microseconds) in arrival order, stored as a packed
+        # int64 array; entries before ``_buf_head`` have been pruned and ``_buf_base`` is the
+        # arrival sequence number of ``_buf_end_us[0]``.
+        self._buf_end_us: "array[int]" = array("q")
+        self._buf_base = 0
+        self._buf_head = 0
+        # Per customer region: (sequence, end_us, transaction_id, customer_id) columns in arrival
+        # order, so decoy lookups only touch one region's facts.
+        self._region_cols: Dict[str, Tuple["array[int]", "array[int]", List[str], List[str]]] = {}
         self.buffer_horizon = timedelta(hours=2)
-        # Target noise bands (stable across seeds/scale):
+        self._horizon_us = self.buffer_horizon // timedelta(microseconds=1)
+        # Target noise bands (stable across seeds/scale), in units of 1/NOISE_RATE_SCALE so the
+        # per-call clamps are exact integer arithmetic:
         # - FN missing txn_id: 2.0%–3.5% of all calls
         # - FP nonexistent txn_id: 0.0%–0.2% of non-empty txn_id calls
         # - Wrong-link: 0.3%–0.7% of joined calls
-        self._missing_rate_target = 0.027
-        self._missing_rate_bounds = (0.02, 0.035)
-        self._fp_rate_target_non_empty = 0.0015
-        self._fp_rate_bounds_non_empty = (0.0, 0.002)
-        self._wrong_link_rate_target_joined = 0.005
-        self._wrong_link_rate_bounds_joined = (0.003, 0.007)
-
-    def _prune_buffer(self, reference_ts) -> None:
-        cutoff = reference_ts - self.buffer_horizon
-        while self.fact_buffer and self.fact_buffer[0]["end_ts"] < cutoff:
-            self.fact_buffer.popleft()
-
-    def _record_fact(self, fact: TransactionFact) -> None:
-        self._prune_buffer(fact.end_ts)
-        self.fact_buffer.append(
-            {
-                "end_ts": fact.end_ts,
-                "region": fact.customer_region,
-                "transaction_id": fact.transaction_id,
-                "customer_id": fact.customer_id,
-            }
-        )
+        self._missing_rate_target = 270
+        self._missing_rate_bounds = (200, 350)
+        self._fp_rate_target_non_empty = 15
+        self._fp_rate_bounds_non_empty = (0, 20)
+        self._wrong_link_rate_target_joined = 50
+        self._wrong_link_rate_bounds_joined = (30, 70)
+
+    def _prune_buffer(self, reference_us: int) -> None:
+        # Facts are only roughly time-ordered, so pruning stops at the first entry still inside
+        # the horizon, exactly like popping from the front of a deque.
+        cutoff = reference_us - self._horizon_us
+        end_us = self._buf_end_us
+        head = self._buf_head
+        tail = len(end_us)
+        while head < tail and end_us[head] < cutoff:
+            head += 1
+        if head >= BUFFER_COMPACT_THRESHOLD:
+            del end_us[:head]
+            self._buf_base += head
+            head = 0
+            for columns in self._region_cols.values():
+                live = bisect_left(columns[0], self._buf_base)
+                for column in columns:
+                    del column[:live]
+        self._buf_head = head
 
-    def _clamp_target_count(self, target_rate: float, bounds: Tuple[float, float], denom_next: int) -> int:
+    def _record_fact(self, fact: TransactionFact, end_us: int) -> None:
+        buf_end_us = self._buf_end_us
+        head = self._buf_head
+        # Most facts leave the front of the ring inside the horizon; only prune when it is not.
+        if head < len(buf_end_us) and buf_end_us[head] < end_us - self._horizon_us:
+            self._prune_buffer(end_us)
+        seq = self._buf_base + len(buf_end_us)
+        buf_end_us.append(end_us)
+        columns = self._region_cols.get(fact.customer_region)
+        if columns is None:
+            columns = self._region_cols[fact.customer_region] = (array("q"), array("q"), [], [])
+        seqs, ends, txns, customers = columns
+        seqs.append(seq)
+        ends.append(end_us)
+        txns.append(fact.transaction_id)
+        customers.append(fact.customer_id)
+
+    @staticmethod
+    def _clamp_target_count(target_rate: int, bounds: Tuple[int, int], denom_next: int) -> int:
+        """``round(target_rate * denom_next)`` clamped to ``[ceil(lower * n), floor(upper * n)]``.
+
+        Rates are integers over ``NOISE_RATE_SCALE``; rounding is half-to-even like ``round``.
+        """
         if denom_next <= 0:
             return 0
         lower, upper = bounds
-        lower_count = int(math.ceil(lower * denom_next))
-        upper_count = int(math.floor(upper * denom_next))
-        desired = int(round(target_rate * denom_next))
+        lower_count = -(-lower * denom_next // NOISE_RATE_SCALE)
+        upper_count = upper * denom_next // NOISE_RATE_SCALE
+        desired, remainder = divmod(target_rate * denom_next, NOISE_RATE_SCALE)
+        if 2 * remainder > NOISE_RATE_SCALE or (2 * remainder == NOISE_RATE_SCALE and desired & 1):
+            desired += 1
         return max(lower_count, min(upper_count, desired))
 
-    def _fabricated_transaction_id(self, call_ts) -> str:
-        return f"FAKE-TX-{call_ts.strftime('%Y%m%d%H%M%S')}-{self.rng.randint(1000, 9999)}"
+    def _fabricated_transaction_id(self, call_us: int) -> str:
+        return f"FAKE-TX-{compact_timestamp_us(call_us)}-{self.rng.randint(1000, 9999)}"
 
-    def _find_decoy(self, call_ts, region: str, customer_id: str) -> Optional[Dict[str, object]]:
-        self._prune_buffer(call_ts)
-        candidates = [
-            item
-            for item in self.fact_buffer
-            if item["region"] == region and item["customer_id"] != customer_id
-        ]
+    def _find_decoy(self, call_us: int, region: str, customer_id: str) -> Optional[str]:
+        """Transaction id of a recent fact from another customer in ``region``, or ``None``."""
+        self._prune_buffer(call_us)
+        columns = self._region_cols.get(region)
+        if columns is None:
+            return None
+        seqs, ends, txns, customers = columns
+        # Sequence numbers are ascending, so the live part of the region starts at a bisection.
+        start = bisect_left(seqs, self._buf_base + self._buf_head)
+        candidates = [idx for idx in range(start, len(seqs)) if customers[idx] != customer_id]
         if not candidates:
             return None
-
-        def within_window(item, min_minutes: int, max_minutes: int) -> bool:
-            delta = abs((call_ts - item["end_ts"]).total_seconds()) / 60.0
-            return min_minutes <= delta <= max_minutes
-
-        preferred = [item for item in candidates if within_window(item, 20, 80)]
-        pool = preferred or [item for item in candidates if within_window(item, 0, 120)]
+        # |call - end| in whole microseconds against the 20-80 / 0-120 minute windows.
+        gaps = [abs(call_us - ends[idx]) for idx in candidates]
+        preferred = [idx for idx, gap in zip(candidates, gaps) if 1_200_000_000 <= gap <= 4_800_000_000]
+        pool = preferred or [idx for idx, gap in zip(candidates, gaps) if gap <= 7_200_000_000]
         if not pool:
             return None
-        return self.rng.choice(pool)
+        return txns[self.rng.choice(pool)]
+
+    def process_facts(self, facts: Sequence[TransactionFact]) -> None:
+        """Process a chunk of facts in stream order; equivalent to calling ``process_fact`` on each.
 
-    def _record_noise(self, noise_type: str) -> None:
-        self.stats.noise_counts[noise_type] = self.stats.noise_counts.get(noise_type, 0) + 1
+        Roughly 98% of facts never produce a call, so the buffer update, probability ladder and
+        call draw run inline here with locals bound once per chunk; only selected facts pay for
+        ``_emit_call``.
+        """
+        record = self._record_fact
+        draw = self.rng.random_source()
+        emit_call = self._emit_call
+        impacted_types = IMPACTED_TYPE_SET
+        for fact in facts:
+            end_us = fact.end_us
+            record(fact, end_us)
+            if fact.transaction_type in impacted_types and fact.customer_region == "central":
+                call_probability = 0.12 if fact.impacted_by_primary else 0.04
+            elif fact.impacted_by_confounder:
+                call_probability = 0.05
+            elif fact.final_status == "timeout":
+                call_probability = 0.03
+            else:
+                call_probability = 0.01
+            if draw() <= call_probability:
+                emit_call(fact, end_us)
 
     def process_fact(self, fact: TransactionFact) -> None:
-        self._record_fact(fact)
-        call_probability = 0.01
-        if fact.transaction_type in IMPACTED_TRANSACTION_TYPES and fact.customer_region == "central":
-            call_probability = 0.12 if fact.impacted_by_primary else 0.04
-        elif fact.impacted_by_confounder:
-            call_probability = 0.05
-        elif fact.final_status == "timeout":
-            call_probability = 0.03
-        if self.rng.random() > call_probability:
-            return
-        delta_minutes = self.rng.randint(5, 120)
-        call_ts = fact.end_ts + timedelta(minutes=delta_minutes)
-        max_ts = END_TS - timedelta(minutes=5)
-        if call_ts >= max_ts:
-            call_ts = max_ts
-        if call_ts <= fact.end_ts:
-            call_ts = fact.end_ts + timedelta(minutes=5)
-            if call_ts > max_ts:
-                call_ts = max_ts
-        call_id = f"TSO-{call_ts.strftime('%Y%m%d%H%M%S')}{self.rng.randint(100, 999)}"
-        issue_category = self.rng.choice(["slow_provisioning", "timeout", "failure"])
-        resolution_time = self.rng.randint(10, 180)
-        escalated = fact.impacted_by_primary and self.rng.random() < 0.6
-        resolution_code = self.rng.choice(["system_resolved", "manual_intervention", "customer_callback"])
+        self.process_facts((fact,))
+
+    def _emit_call(self, fact: TransactionFact, end_us: int) -> None:
+        rng = self.rng
+        randint = rng.randint
+        choice = rng.choice
+        delay_minutes = randint(5, 120)
+        call_us = end_us + delay_minutes * US_PER_MINUTE
+        # Only calls pushed past the end of the window are clamped; the rest keep the drawn delay.
+        if call_us >= _MAX_CALL_US:
+            call_us = _MAX_CALL_US
+            if call_us <= end_us:
+                call_us = min(end_us + 5 * US_PER_MINUTE, _MAX_CALL_US)
+            delay_minutes = max(0, (call_us - end_us) // US_PER_MINUTE)
+        call_id = f"TSO-{compact_timestamp_us(call_us)}{randint(100, 999)}"
+        issue_category = choice(ISSUE_CATEGORIES)
+        resolution_time = randint(10, 180)
+        escalated = fact.impacted_by_primary and rng.random() < 0.6
+        resolution_code = choice(RESOLUTION_CODES)
         txn_ref = fact.transaction_id
-        noise_type = "clean"
-        total_next = self.stats.rows + 1
-        missing_count = self.stats.noise_counts.get("missing", 0)
-        fabricated_count = self.stats.noise_counts.get("fabricated", 0)
-        wrong_count = self.stats.noise_counts.get("wrong_customer", 0)
-
-        missing_target = self._clamp_target_count(self._missing_rate_target, self._missing_rate_bounds, total_next)
-        if missing_count < missing_target:
-            noise_type = "missing"
+        noise_id = NOISE_CLEAN
+        stats = self.stats
+        clamp = self._clamp_target_count
+        noise_type_counts = stats.noise_type_counts
+        missing_count = noise_type_counts[NOISE_MISSING]
+        fabricated_count = noise_type_counts[NOISE_FABRICATED]
+        total_next = stats.rows + 1
+        non_empty_next = total_next - missing_count
+        # Each band's target is only computed once the bands before it are met.
+        if missing_count < clamp(self._missing_rate_target, self._missing_rate_bounds, total_next):
+            noise_id = NOISE_MISSING
             txn_ref = ""
-        else:
-            non_empty_next = total_next - missing_count
-            fabricated_target = self._clamp_target_count(
-                self._fp_rate_target_non_empty,
-                self._fp_rate_bounds_non_empty,
-                non_empty_next,
-            )
-            if fabricated_count < fabricated_target:
-                noise_type = "fabricated"
-                txn_ref = self._fabricated_transaction_id(call_ts)
-            else:
-                joined_next = total_next - missing_count - fabricated_count
-                wrong_target = self._clamp_target_count(
-                    self._wrong_link_rate_target_joined,
-                    self._wrong_link_rate_bounds_joined,
-                    joined_next,
-                )
-                if wrong_count < wrong_target:
-                    decoy = self._find_decoy(call_ts, fact.customer_region, fact.customer_id)
-                    if decoy:
-                        noise_type = "wrong_customer"
-                        txn_ref = decoy["transaction_id"]  # type: ignore[index]
-
-        self._record_noise(noise_type)
-        delay_minutes = max(0, int((call_ts - fact.end_ts).total_seconds() // 60))
-        self.writer.write_row(
-            [
-                call_id,
-                isoformat(call_ts, ms=False),
-                fact.customer_id,
-                fact.customer_region,
-                issue_category,
-                self.rng.choice(ISSUE_NOTES),
-                fact.service_type,
-                txn_ref,
-                resolution_time,
-                str(escalated).lower(),
-                resolution_code,
-            ]
+        elif fabricated_count < clamp(
+            self._fp_rate_target_non_empty, self._fp_rate_bounds_non_empty, non_empty_next
+        ):
+            noise_id = NOISE_FABRICATED
+            txn_ref = self._fabricated_transaction_id(call_us)
+        elif noise_type_counts[NOISE_WRONG_CUSTOMER] < clamp(
+            self._wrong_link_rate_target_joined,
+            self._wrong_link_rate_bounds_joined,
+            non_empty_next - fabricated_count,
+        ):
+            decoy = self._find_decoy(call_us, fact.customer_region, fact.customer_id)
+            if decoy:
+                noise_id = NOISE_WRONG_CUSTOMER
+                txn_ref = decoy
+        noise_type_counts[noise_id] += 1
+        row = (
+            call_id,
+            isoformat_sec_us(call_us),
+            fact.customer_id,
+            fact.customer_region,
+            issue_category,
+            choice(ISSUE_NOTES),
+            fact.service_type,
+            txn_ref,
+            resolution_time,
+            str(escalated).lower(),
+            resolution_code,
         )
-        self.stats.rows += 1
+        row_buf = self._row_buf
+        row_buf.append(row)
+        if len(row_buf) >= WRITE_BATCH_ROWS:
+            self._flush_rows()
+        stats.rows += 1
         if txn_ref:
-            self.stats.non_empty_refs += 1
-            if noise_type == "clean":
-                self.stats.matches += 1
+            stats.non_empty_refs += 1
+            if noise_id == NOISE_CLEAN:
+                stats.matches += 1
         if fact.impacted_by_primary:
-            self.stats.incident_calls += 1
-        self.stats.call_records.append(
-            TSOCallRecord(
-                call_id=call_id,
-                true_transaction_id=fact.transaction_id,
-                emitted_transaction_id=txn_ref,
-                noise_type=noise_type,
-                delay_minutes=delay_minutes,
-            )
-        )
+            stats.incident_calls += 1
+        stats.add_call_record(call_id, fact.transaction_id, txn_ref, NOISE_TYPES[noise_id], delay_minutes)
+
+    def _flush_rows(self) -> None:
+        rows = self._row_buf
+        if not rows:
+            return
+        self.writer.write_formatted(rows, TSO_CSV_LINE)
+        rows.clear()
 
     def finalize(self) -> TSOStats:
+        self._flush_rows()
         return self.stats
 
 
-__all__ = ["TSO_HEADERS", "TSOCallGenerator", "TSOStats", "TSOCallRecord"]
+__all__ = ["TSO_HEADERS", "NOISE_TYPES", "TSOCallGenerator", "TSOStats", "TSOCallRecord"]
@@ -1,25 +1,36 @@
 from __future__ import annotations
 
+from bisect import bisect_left
 from dataclasses import dataclass
 from datetime import datetime, timedelta
+from itertools import accumulate
 from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 
 from utils import (
+    CSV_LINE_TERMINATOR,
     ConfounderWindow,
     DatasetConfig,
     IncidentWindow,
     RandomGenerator,
+    Row,
+    WindowIndex,
+    compact_timestamp_us,
     diurnal_factor,
+    from_epoch_us,
     generate_incident_bursts,
-    in_any_window,
-    isoformat,
+    isoformat_us,
     minutes_between,
+    ms_to_us,
+    seconds_to_us,
+    to_epoch_us,
     START_TS,
     END_TS,
 )
 
 
 IMPACTED_TRANSACTION_TYPES = ["provision_fiber_sqs", "modify_service_profile"]
+# Set form for per-fact membership tests; the list above is what ground truth reports.
+IMPACTED_TYPE_SET = frozenset(IMPACTED_TRANSACTION_TYPES)
 NON_IMPACTED_TYPES = [
     "cancel_subscription",
     "diagnostic_ping",
@@ -36,6 +47,12 @@ SERVICE_TYPE_MAP = {
     "firmware_update": "fiber_internet",
     "service_health_check": "fiber_sqs",
 }
+# (transaction_type, service_type, impacted) per type, so a fact's type draw carries the labels
+# derived from it instead of looking them up again for every fact.
+_TYPE_PROFILES = {
+    txn_type: (txn_type, service_type, txn_type in IMPACTED_TYPE_SET)
+    for txn_type, service_type in SERVICE_TYPE_MAP.items()
+}
 REGIONS = ["east", "west", "central", "north", "south"]
 REGION_WEIGHTS = {"central": 0.35, "east": 0.25, "west": 0.20, "north": 0.10, "south": 0.10}
 SERVICES_CHAIN = ["api", "orchestrator", "worker"]
@@ -51,9 +68,11 @@ TXN_FACT_HEADERS = [
     "error_code",
     "end_to_end_latency_ms",
 ]
+# Line format for ``TableWriter.write_formatted`` of rows built by ``txn_fact_row``.
+TXN_FACT_CSV_LINE = "%s,%s,%s,%s,%s,%s,%s,%s,%r" + CSV_LINE_TERMINATOR
 
 
-@dataclass
+@dataclass(slots=True)
 class TransactionFact:
     transaction_id: str
     trace_id: str
@@ -62,8 +81,9 @@ class TransactionFact:
     transaction_type: str
     service_type: str
     region: str
-    start_ts: datetime
-    end_ts: datetime
+    # Epoch microseconds; ``start_ts``/``end_ts`` build the equivalent datetimes on demand.
+    start_us: int
+    end_us: int
     dependency_region: Optional[str]
     dependency_service: Optional[str]
     circuit_id: Optional[str]
@@ -81,23 +101,43 @@ class TransactionFact:
     clock_skew_ms: int
     services_chain: Sequence[str]
 
+    @property
+    def start_ts(self) -> datetime:
+        return from_epoch_us(self.start_us)
+
+    @property
+    def end_ts(self) -> datetime:
+        return from_epoch_us(self.end_us)
+
     @property
     def attempt_count(self) -> int:
         return max(1, self.retry_count + 1)
 
 
-def txn_fact_row(fact: "TransactionFact") -> List[object]:
-    return [
+def txn_fact_row(fact: "TransactionFact", start_iso: Optional[str] = None) -> Row:
+    return (
         fact.transaction_id,
         fact.customer_id,
         fact.region,
         fact.transaction_type,
-        isoformat(fact.start_ts),
-        isoformat(fact.end_ts),
+        start_iso if start_iso is not None else isoformat_us(fact.start_us),
+        isoformat_us(fact.end_us),
         "true" if fact.final_status != "timeout" else "false",
         fact.error_code or "",
         round(fact.end_to_end_latency_ms, 2),
-    ]
+    )
+
+
+def _transaction_type_weights(region: str) -> Dict[str, float]:
+    return {
+        "provision_fiber_sqs": 0.25 if region == "central" else 0.15,
+        "modify_service_profile": 0.18 if region == "central" else 0.12,
+        "cancel_subscription": 0.08,
+        "diagnostic_ping": 0.17,
+        "update_billing": 0.17,
+        "firmware_update": 0.10,
+        "service_health_check": 0.15,
+    }
 
 
 class TransactionFactStream:
@@ -111,9 +151,45 @@ class TransactionFactStream:
     ) -> None:
         self.config = config
         self.rng = rng
+        # Fact generation makes several scalar draws per row, so it calls random() directly.
+        self._random = rng.random_source()
+        self._customer_number = rng.randint_sampler(10000000, 99999999)
+        self._clock_skew_ms = rng.randint_sampler(-500, 500)
         self.incident = incident_window
         self.confounders = confounders
         self.circuit_routes = circuit_routes
+        # Outbound routes per region paired with the circuits a background cross-region call may
+        # use: the route's circuits other than the incident circuit, falling back to all of them
+        # and then to the incident circuit itself.
+        self._region_routes: Dict[str, List[Tuple[tuple, List[str]]]] = {region: [] for region in REGIONS}
+        for route, route_circuits in circuit_routes.items():
+            if route[0] not in self._region_routes or route[1] == route[0]:
+                continue
+            circuits = [cid for cid in (route_circuits or []) if cid != incident_window.circuit_id]
+            if not circuits:
+                circuits = route_circuits or [incident_window.circuit_id]
+            self._region_routes[route[0]].append((route, circuits))
+        self._bursts = WindowIndex((to_epoch_us(start), to_epoch_us(end)) for start, end in incident_window.bursts)
+        # (start_us, end_us, name) of the confounders that can apply to each region, in their
+        # original (first match wins) order.
+        self._region_confounders = {
+            region: [
+                (to_epoch_us(conf.start), to_epoch_us(conf.end), conf.name)
+                for conf in confounders
+                if conf.region == region or conf.region == "*"
+            ]
+            for region in REGIONS
+        }
+        # Region and per-region transaction type weights never change, so their running totals are
+        # built once and each draw bisects them. The cumulative sums are accumulated in the same
+        # order as a linear weighted scan, so the same draw selects the same key.
+        self._region_cdf = list(accumulate(REGION_WEIGHTS.get(region, 0.0) for region in REGIONS))
+        self._type_samplers = {
+            region: rng.weighted_sampler(
+                {_TYPE_PROFILES[txn_type]: weight for txn_type, weight in _transaction_type_weights(region).items()}
+            )
+            for region in REGIONS
+        }
         self.total_minutes = minutes_between(START_TS, END_TS)
         self.base_per_minute = config.transaction_count / max(1, self.total_minutes)
         self.minute_cursor = START_TS
@@ -121,22 +197,24 @@ class TransactionFactStream:
         self.carry = 0.0
 
     def __iter__(self) -> Iterator[TransactionFact]:
+        total = self.config.transaction_count
         for minute in self._minute_iterator():
-            if self.generated >= self.config.transaction_count:
+            if self.generated >= total:
                 break
             count = self._transactions_for_minute(minute)
-            for _ in range(count):
-                if self.generated >= self.config.transaction_count:
-                    break
-                ts = minute + timedelta(seconds=self.rng.uniform(0, 60))
-                fact = self._build_fact(ts, self.generated)
-                self.generated += 1
-                yield fact
-        while self.generated < self.config.transaction_count:
+            yield from self._build_minute(minute, min(count, total - self.generated))
+        while self.generated < total:
             minute = START_TS + timedelta(minutes=self.rng.randint(0, self.total_minutes - 1))
-            ts = minute + timedelta(seconds=self.rng.uniform(0, 60))
-            fact = self._build_fact(ts, self.generated)
-            self.generated += 1
+            yield from self._build_minute(minute, 1)
+
+    def _build_minute(self, minute: datetime, count: int) -> Iterator[TransactionFact]:
+        """``count`` facts at uniformly drawn offsets into ``minute``, generated as one batch."""
+        uniform = self.rng.uniform
+        build_fact = self._build_fact
+        minute_us = to_epoch_us(minute)
+        for seq in range(self.generated, self.generated + count):
+            fact = build_fact(minute_us + seconds_to_us(uniform(0, 60)), seq)
+            self.generated = seq + 1
             yield fact
 
     def _minute_iterator(self) -> Iterator[datetime]:
@@ -155,89 +233,68 @@ class TransactionFactStream:
         return deterministic
 
     def _select_region(self) -> str:
-        r = self.rng.random()
-        cumulative = 0.0
-        for region in REGIONS:
-            weight = REGION_WEIGHTS.get(region, 0.0)
-            cumulative += weight
-            if r <= cumulative:
-                return region
-        return "central"
-
-    def _select_transaction_type(self, region: str) -> str:
-        weights: Dict[str, float] = {
-            "provision_fiber_sqs": 0.25 if region == "central" else 0.15,
-            "modify_service_profile": 0.18 if region == "central" else 0.12,
-            "cancel_subscription": 0.08,
-            "diagnostic_ping": 0.17,
-            "update_billing": 0.17,
-            "firmware_update": 0.10,
-            "service_health_check": 0.15,
-        }
-        return self.rng.weighted_choice(weights)
+        index = bisect_left(self._region_cdf, self._random())
+        return REGIONS[index] if index < len(REGIONS) else "central"
+
+    def _select_transaction_type(self, region: str) -> Tuple[str, str, bool]:
+        """(transaction_type, service_type, impacted) of a weighted type draw for ``region``."""
+        return self._type_samplers[region]()
 
-    def _build_fact(self, ts: datetime, seq: int) -> TransactionFact:
+    def _build_fact(self, start_us: int, seq: int) -> TransactionFact:
+        rng = self.rng
+        random = self._random
+        uniform = rng.uniform
         region = self._select_region()
-        transaction_type = self._select_transaction_type(region)
-        service_type = SERVICE_TYPE_MAP[transaction_type]
-        customer_id = f"CUST-{self.rng.randint(10000000, 99999999)}"
-        transaction_id = f"TX-{ts.strftime('%Y%m%d%H%M%S')}-{seq:07d}"
-        trace_id = self.rng.hex_id("tr")
+        transaction_type, service_type, impacted_type = self._select_transaction_type(region)
+        customer_id = f"CUST-{self._customer_number()}"
+        transaction_id = "TX-%s-%07d" % (compact_timestamp_us(start_us), seq)
+        trace_id = rng.hex_id("tr")
         makes_cross_region_call = False
         dependency_region: Optional[str] = None
         dependency_service: Optional[str] = None
         circuit_id: Optional[str] = None
-        base_latency = 420.0 if transaction_type in IMPACTED_TRANSACTION_TYPES else 280.0
+        base_latency = 420.0 if impacted_type else 280.0
         dependency_latency = 0.0
         impacted_by_primary = False
-        if transaction_type in IMPACTED_TRANSACTION_TYPES and region == "central":
+        if impacted_type and region == "central":
             makes_cross_region_call = True
             dependency_region = "east"
             dependency_service = DEPENDENCY_SERVICE
             circuit_id = self.incident.circuit_id
-            if in_any_window(ts, self.incident.bursts):
+            if start_us in self._bursts:
                 impacted_by_primary = True
-                dependency_latency = base_latency * self.rng.uniform(5, 12)
+                dependency_latency = base_latency * uniform(5, 12)
             else:
-                dependency_latency = base_latency * self.rng.uniform(0.9, 1.6)
+                dependency_latency = base_latency * uniform(0.9, 1.6)
         else:
-            available_routes = [pair for pair in self.circuit_routes if pair[0] == region and pair[1] != region]
-            if available_routes and self.rng.random() < 0.08:
+            available_routes = self._region_routes[region]
+            if available_routes and random() < 0.08:
                 makes_cross_region_call = True
-                route = self.rng.choice(available_routes)
+                route, circuits = rng.choice(available_routes)
                 dependency_region = route[1]
                 dependency_service = "inventory-client"
-                circuits = [
-                    cid
-                    for cid in (self.circuit_routes.get(route) or [])
-                    if cid != self.incident.circuit_id
-                ]
-                if not circuits:
-                    circuits = self.circuit_routes.get(route) or []
-                if not circuits:
-                    circuits = [self.incident.circuit_id]
-                circuit_id = self.rng.choice(circuits)
-                dependency_latency = base_latency * self.rng.uniform(0.8, 1.8)
+                circuit_id = rng.choice(circuits)
+                dependency_latency = base_latency * uniform(0.8, 1.8)
 
         confounder_label: Optional[str] = None
         impacted_by_confounder = False
-        for conf in self.confounders:
-            if conf.start <= ts < conf.end and (conf.region == region or conf.region == "*"):
+        for conf_start_us, conf_end_us, conf_name in self._region_confounders[region]:
+            if conf_start_us <= start_us < conf_end_us:
                 impacted_by_confounder = True
-                confounder_label = conf.name
+                confounder_label = conf_name
                 break
 
         burst_multiplier = 1.0
         if impacted_by_primary:
-            burst_multiplier = self.rng.uniform(2.5, 4.5)
+            burst_multiplier = uniform(2.5, 4.5)
         elif impacted_by_confounder:
-            burst_multiplier = self.rng.uniform(1.2, 1.8)
+            burst_multiplier = uniform(1.2, 1.8)
 
-        end_to_end = base_latency * (0.8 + self.rng.uniform(0.0, 0.4)) * burst_multiplier
+        end_to_end = base_latency * (0.8 + uniform(0.0, 0.4)) * burst_multiplier
         retry_count = 0
         if impacted_by_primary:
-            retry_count = self.rng.randint(1, 3)
-        elif impacted_by_confounder and self.rng.random() < 0.4:
+            retry_count = rng.randint(1, 3)
+        elif impacted_by_confounder and random() < 0.4:
             retry_count = 1
 
         status = "success"
@@ -248,18 +305,17 @@ class TransactionFactStream:
             failure_bias = 0.35
         elif impacted_by_confounder:
             failure_bias = 0.12
-        if self.rng.random() < failure_bias:
+        if random() < failure_bias:
             status = "timeout"
             http_status = "504"
             error_code = "DEP_TIMEOUT" if makes_cross_region_call else "ORCH_TIMEOUT"
-        elif self.rng.random() < 0.08:
+        elif random() < 0.08:
             status = "retry"
             http_status = "202"
         elif retry_count > 0:
             status = "completed_after_retry"
 
-        clock_skew = self.rng.randint(-500, 500)
-        end_ts = ts + timedelta(milliseconds=end_to_end)
+        clock_skew = self._clock_skew_ms()
 
         return TransactionFact(
             transaction_id=transaction_id,
@@ -269,8 +325,8 @@ class TransactionFactStream:
             transaction_type=transaction_type,
             service_type=service_type,
             region=region,
-            start_ts=ts,
-            end_ts=end_ts,
+            start_us=start_us,
+            end_us=start_us + ms_to_us(end_to_end),
             dependency_region=dependency_region,
             dependency_service=dependency_service,
             circuit_id=circuit_id,
@@ -334,6 +390,7 @@ __all__ = [
     "build_incident",
     "default_confounders",
     "IMPACTED_TRANSACTION_TYPES",
+    "IMPACTED_TYPE_SET",
     "REGIONS",
     "TXN_FACT_HEADERS",
     "txn_fact_row",
@@ -1,36 +1,158 @@
 from __future__ import annotations
 
 import csv
+import importlib
+import io
 import math
 import os
 import random
-from dataclasses import dataclass
+import stat
+import time
+import zipfile
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta, timezone
-from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from itertools import accumulate
+from typing import Any, Callable, DefaultDict, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, TextIO, Tuple, TypeVar, Union, overload
 
 ISO_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
 ISO_FORMAT_NO_MS = "%Y-%m-%dT%H:%M:%SZ"
 DATASET_NAME = "simulated_fibersqs_cross_region_latency_tso"
+ZIP_PART_SUFFIX = ".zpart"
+CSV_BUFFER_ROWS = 65536
+CSV_FILE_BUFFER_BYTES = 4 << 20
+# csv.writer's default (excel) dialect line ending, for rows written with CsvWriter.write_raw.
+CSV_LINE_TERMINATOR = "\r\n"
+# Generators hand rows to writers in local batches of this size via ``write_rows``.
+WRITE_BATCH_ROWS = 4096
+OUTPUT_FORMATS = ("csv", "parquet")
+PARQUET_ROW_GROUP_ROWS = 131072
+# Columns stored as Arrow timestamps / int64 / float64 / dictionary-encoded strings in Parquet
+# output; any other column is a plain string.
+PARQUET_TIMESTAMP_COLUMNS = frozenset({"timestamp", "start_ts", "end_ts"})
+PARQUET_INT_COLUMNS = frozenset({"dependency_latency_ms", "resolution_time_minutes"})
+PARQUET_FLOAT_COLUMNS = frozenset(
+    {
+        "end_to_end_latency_ms",
+        "duration_ms",
+        "rtt_ms",
+        "packet_loss_pct",
+        "retransmits_per_s",
+        "throughput_mbps",
+        "cpu_pct",
+        "mem_pct",
+        "disk_io_util_pct",
+        "net_errs_per_s",
+        "request_rate",
+        "error_rate",
+        "p95_latency_ms",
+        "p99_latency_ms",
+        "saturation",
+    }
+)
+PARQUET_DICTIONARY_COLUMNS = frozenset(
+    {
+        "region",
+        "origin_region",
+        "customer_region",
+        "src_region",
+        "dst_region",
+        "dependency_region",
+        "cluster",
+        "service",
+        "dependency_service",
+        "host",
+        "level",
+        "transaction_type",
+        "txn_type",
+        "event",
+        "event_type",
+        "operation",
+        "status",
+        "severity",
+        "circuit_id",
+        "error_code",
+        "issue_category",
+        "service_type",
+        "resolution_code",
+    }
+)
 START_TS = datetime(2025, 12, 1, tzinfo=timezone.utc)
 END_TS = datetime(2025, 12, 8, tzinfo=timezone.utc)
 
+T = TypeVar("T")
+# One output record; generators build rows as tuples, which the csv writer iterates fastest.
+Row = Tuple[object, ...]
+
 
 class RandomGenerator:
-    """Wrapper around random.Random to centralise deterministic behaviour."""
+    """Wrapper around random.Random to centralise deterministic behaviour.
+
+    ``random`` and ``uniform`` accept ``size`` to draw a list in one call; batched draws consume
+    the stream exactly like the equivalent sequence of scalar calls, so callers can batch
+    without changing generated data.
+    """
 
     def __init__(self, seed: int) -> None:
         self._rand = random.Random(seed)
 
-    def random(self) -> float:
-        return self._rand.random()
+    @overload
+    def random(self) -> float: ...
+
+    @overload
+    def random(self, size: int) -> List[float]: ...
+
+    def random(self, size: Optional[int] = None) -> Union[float, List[float]]:
+        if size is None:
+            return self._rand.random()
+        rand = self._rand.random
+        return [rand() for _ in range(size)]
+
+    @overload
+    def uniform(self, a: float, b: float) -> float: ...
 
-    def uniform(self, a: float, b: float) -> float:
-        return self._rand.uniform(a, b)
+    @overload
+    def uniform(self, a: float, b: float, size: int) -> List[float]: ...
+
+    def uniform(self, a: float, b: float, size: Optional[int] = None) -> Union[float, List[float]]:
+        if size is None:
+            return self._rand.uniform(a, b)
+        rand = self._rand.random
+        span = b - a
+        return [a + span * rand() for _ in range(size)]
+
+    def random_source(self) -> Callable[[], float]:
+        """The underlying ``random()`` callable, for hot loops that interleave scalar draws.
+
+        Calling it consumes the stream exactly like ``random()`` but skips the wrapper dispatch.
+        """
+        return self._rand.random
 
     def randint(self, a: int, b: int) -> int:
         return self._rand.randint(a, b)
 
-    def choice(self, seq: Sequence):
+    def randint_sampler(self, a: int, b: int) -> Callable[[], int]:
+        """``randint(a, b)`` for repeated draws from a fixed range.
+
+        Inlines ``random.Random``'s rejection sampling over ``getrandbits``, so each call consumes
+        the stream exactly like ``randint(a, b)`` without the ``randrange`` argument checks.
+        """
+        width = b - a + 1
+        if width <= 0:
+            raise ValueError("empty range for randint_sampler(%d, %d)" % (a, b))
+        bits = width.bit_length()
+        getrandbits = self._rand.getrandbits
+
+        def sample() -> int:
+            value = getrandbits(bits)
+            while value >= width:
+                value = getrandbits(bits)
+            return a + value
+
+        return sample
+
+    def choice(self, seq: Sequence[T]) -> T:
         return self._rand.choice(seq)
 
     def weighted_choice(self, weights: Dict[str, float]) -> str:
@@ -45,6 +167,26 @@ class RandomGenerator:
                 return key
         return next(iter(weights))
 
+    def weighted_sampler(self, weights: Mapping[T, float]) -> Callable[[], T]:
+        """``weighted_choice(weights)`` for repeated draws from a fixed weights mapping.
+
+        The cumulative weights are built once and each call bisects them; a call consumes the same
+        single draw as ``weighted_choice`` and returns the same key.
+        """
+        keys = list(weights)
+        clipped = [max(w, 0.0) for w in weights.values()]
+        total = sum(clipped)
+        if total <= 0:
+            raise ValueError("Weights must sum to > 0")
+        cumulative = list(accumulate(clipped))
+        uniform = self._rand.uniform
+
+        def sample() -> T:
+            index = bisect_left(cumulative, uniform(0, total))
+            return keys[index] if index < len(keys) else keys[0]
+
+        return sample
+
     def expovariate(self, lambd: float) -> float:
         return self._rand.expovariate(lambd)
 
@@ -52,11 +194,17 @@ class RandomGenerator:
         return self._rand.gauss(mu, sigma)
 
     def hex_id(self, prefix: str, length: int = 12) -> str:
-        value = ''.join(self._rand.choice('0123456789abcdef') for _ in range(length))
-        return f"{prefix}{value}"
+        """``prefix`` followed by ``length`` random lowercase hex digits, from one ``getrandbits`` call."""
+        return "%s%0*x" % (prefix, length, self._rand.getrandbits(4 * length))
+
+    def hex_ids(self, prefix: str, n: int, length: int = 12) -> List[str]:
+        """``n`` consecutive ``hex_id`` draws."""
+        getrandbits = self._rand.getrandbits
+        bits = 4 * length
+        return ["%s%0*x" % (prefix, length, getrandbits(bits)) for _ in range(n)]
 
 
-@dataclass
+@dataclass(slots=True)
 class IncidentWindow:
     start: datetime
     end: datetime
@@ -67,7 +215,7 @@ class IncidentWindow:
     dst_region: str
 
 
-@dataclass
+@dataclass(slots=True)
 class ConfounderWindow:
     name: str
     start: datetime
@@ -91,25 +239,130 @@ def daterange_5m(start: datetime, end: datetime) -> Iterator[datetime]:
         cursor += timedelta(minutes=5)
 
 
+def isoformat_ms(dt: datetime) -> str:
+    """``dt`` as ``ISO_FORMAT`` (microsecond precision, ``Z`` suffix)."""
+    # Fixed-width %-formatting of the fields matches ISO_FORMAT/ISO_FORMAT_NO_MS at about twice
+    # the speed of strftime, which re-parses the format string on every call; it also beats the
+    # equivalent f-string with per-field format specs.
+    return "%04d-%02d-%02dT%02d:%02d:%02d.%06dZ" % (
+        dt.year, dt.month, dt.day, dt.hour, dt.minute, dt.second, dt.microsecond
+    )
+
+
+def isoformat_sec(dt: datetime) -> str:
+    """``dt`` as ``ISO_FORMAT_NO_MS`` (whole seconds, ``Z`` suffix)."""
+    return "%04d-%02d-%02dT%02d:%02d:%02dZ" % (dt.year, dt.month, dt.day, dt.hour, dt.minute, dt.second)
+
+
+def compact_timestamp(dt: datetime) -> str:
+    """``dt`` as ``YYYYMMDDHHMMSS``, the ``strftime('%Y%m%d%H%M%S')`` form used in synthetic ids."""
+    return "%04d%02d%02d%02d%02d%02d" % (dt.year, dt.month, dt.day, dt.hour, dt.minute, dt.second)
+
+
 def isoformat(dt: datetime, ms: bool = True) -> str:
-    if ms:
-        return dt.strftime(ISO_FORMAT)
-    return dt.strftime(ISO_FORMAT_NO_MS)
+    return isoformat_ms(dt) if ms else isoformat_sec(dt)
+
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_ONE_US = timedelta(microseconds=1)
+US_PER_MINUTE = 60_000_000
+_US_PER_DAY = 86_400_000_000
+_DAY_PREFIXES: Dict[int, str] = {}
+_MINUTE_PREFIXES: Dict[int, str] = {}
+
+
+def to_epoch_us(dt: datetime) -> int:
+    """Integer microseconds since the Unix epoch for an aware ``dt``."""
+    return (dt - EPOCH) // _ONE_US
+
+
+def from_epoch_us(us: int) -> datetime:
+    """Inverse of ``to_epoch_us``: the aware UTC datetime ``us`` microseconds after the epoch."""
+    return EPOCH + timedelta(microseconds=us)
+
+
+def ms_to_us(ms: float) -> int:
+    """Microseconds in ``timedelta(milliseconds=ms)``, rounded the same way (half to even)."""
+    whole = int(ms)
+    return whole * 1000 + round((ms - whole) * 1000)
+
+
+def seconds_to_us(seconds: float) -> int:
+    """Microseconds in ``timedelta(seconds=seconds)``, rounded the same way (half to even)."""
+    whole = int(seconds)
+    return whole * 1_000_000 + round((seconds - whole) * 1_000_000)
+
+
+def _day_prefix(days: int) -> str:
+    """``YYYY-MM-DDT`` for the day ``days`` after the epoch, cached per day."""
+    prefix = _DAY_PREFIXES.get(days)
+    if prefix is None:
+        day = EPOCH + timedelta(days=days)
+        prefix = _DAY_PREFIXES[days] = "%04d-%02d-%02dT" % (day.year, day.month, day.day)
+    return prefix
+
+
+def _minute_prefix(minute: int) -> str:
+    """``YYYY-MM-DDTHH:MM:`` for the minute ``minute`` minutes after the epoch, cached per minute."""
+    days, minute_of_day = divmod(minute, 1440)
+    hours, minutes = divmod(minute_of_day, 60)
+    prefix = _MINUTE_PREFIXES[minute] = "%s%02d:%02d:" % (_day_prefix(days), hours, minutes)
+    return prefix
+
+
+def isoformat_us(us: int) -> str:
+    """``isoformat`` for an epoch-microsecond timestamp without building a ``datetime``."""
+    # Timestamps cluster within a week, so the date/hour/minute prefix comes from a per-minute
+    # cache and only the seconds and microseconds are formatted per call.
+    minute, rem = divmod(us, US_PER_MINUTE)
+    prefix = _MINUTE_PREFIXES.get(minute)
+    if prefix is None:
+        prefix = _minute_prefix(minute)
+    seconds, micros = divmod(rem, 1_000_000)
+    return "%s%02d.%06dZ" % (prefix, seconds, micros)
+
+
+def isoformat_sec_us(us: int) -> str:
+    """``isoformat_sec`` for an epoch-microsecond timestamp."""
+    minute, rem = divmod(us, US_PER_MINUTE)
+    prefix = _MINUTE_PREFIXES.get(minute)
+    if prefix is None:
+        prefix = _minute_prefix(minute)
+    return "%s%02dZ" % (prefix, rem // 1_000_000)
+
+
+def compact_timestamp_us(us: int) -> str:
+    """``compact_timestamp`` for an epoch-microsecond timestamp."""
+    days, rem = divmod(us, _US_PER_DAY)
+    prefix = _day_prefix(days)
+    hours, seconds = divmod(rem // 1_000_000, 3600)
+    minutes, seconds = divmod(seconds, 60)
+    return "%s%s%s%02d%02d%02d" % (prefix[:4], prefix[5:7], prefix[8:10], hours, minutes, seconds)
 
 
 def ensure_dir(path: str) -> None:
     os.makedirs(path, exist_ok=True)
 
 
+def _diurnal_value(hour: int, minute: int, weekend: bool) -> float:
+    base = 0.55 + 0.45 * math.sin((hour + minute / 60.0 - 3) / 24.0 * 2 * math.pi)
+    return max(0.2, base) * (0.85 if weekend else 1.0)
+
+
+# diurnal_factor only depends on the minute of day and whether it is a weekend, so both curves
+# are tabulated once: _DIURNAL_FACTORS[weekend][hour * 60 + minute].
+_DIURNAL_FACTORS = [
+    [_diurnal_value(hour, minute, weekend) for hour in range(24) for minute in range(60)]
+    for weekend in (False, True)
+]
+
+
 def diurnal_factor(dt: datetime) -> float:
-    hour = dt.hour + dt.minute / 60.0
-    base = 0.55 + 0.45 * math.sin((hour - 3) / 24.0 * 2 * math.pi)
-    weekend = 0.85 if dt.weekday() >= 5 else 1.0
-    return max(0.2, base) * weekend
+    return _DIURNAL_FACTORS[dt.weekday() >= 5][dt.hour * 60 + dt.minute]
 
 
 def heavy_tail_latency(base_ms: float, rng: RandomGenerator, burst_multiplier: float = 1.0) -> float:
-    samples = sum(rng.random() for _ in range(3)) / 3.0
+    samples = sum(rng.random(size=3)) / 3.0
     tail = (1.0 - math.log(max(1e-6, samples)))
     latency = base_ms * (0.7 + tail) * burst_multiplier
     return max(base_ms * 0.5, latency)
@@ -123,19 +376,22 @@ def generate_incident_bursts(
     min_duration: int = 4,
     max_duration: int = 7,
 ) -> List[Tuple[datetime, datetime]]:
+    period = timedelta(minutes=period_minutes)
+    count = max(0, -(-(window_end - window_start) // period))
+    # One batched draw holds each burst's (jitter, duration) pair in the order the per-burst
+    # uniform() calls consumed them.
+    draws = rng.random(size=2 * count)
     bursts: List[Tuple[datetime, datetime]] = []
-    cursor = window_start
-    while cursor < window_end:
-        jitter = timedelta(minutes=rng.uniform(-2, 2))
-        burst_start = cursor + jitter
-        duration_min = rng.uniform(min_duration, max_duration)
+    for index in range(count):
+        jitter_min = -2 + 4 * draws[2 * index]
+        duration_min = min_duration + (max_duration - min_duration) * draws[2 * index + 1]
+        burst_start = window_start + index * period + timedelta(minutes=jitter_min)
         burst_end = burst_start + timedelta(minutes=duration_min)
         if burst_end > window_end:
             burst_end = window_end
         if burst_start < window_start:
             burst_start = window_start
         bursts.append((burst_start, burst_end))
-        cursor += timedelta(minutes=period_minutes)
     return bursts
 
 
@@ -146,6 +402,24 @@ def in_any_window(ts: datetime, windows: Sequence[Tuple[datetime, datetime]]) ->
     return False
 
 
+class WindowIndex:
+    """``in_any_window`` over a fixed set of windows in O(log n) per lookup.
+
+    Windows are sorted by start and paired with the running maximum of their ends, so a point is
+    covered iff the last window starting at or before it has a running end beyond it. Overlapping
+    windows are handled; works for any ordered timestamp type.
+    """
+
+    def __init__(self, windows: Iterable[Tuple[Any, Any]]) -> None:
+        ordered = sorted(windows)
+        self._starts = [start for start, _ in ordered]
+        self._ends = list(accumulate((end for _, end in ordered), max))
+
+    def __contains__(self, ts: Any) -> bool:
+        index = bisect_right(self._starts, ts)
+        return index > 0 and ts < self._ends[index - 1]
+
+
 def minutes_between(start: datetime, end: datetime) -> int:
     return int((end - start).total_seconds() // 60)
 
@@ -154,23 +428,219 @@ def jitter_timestamp(ts: datetime, rng: RandomGenerator, span_seconds: float = 1
     return ts + timedelta(seconds=rng.uniform(0, span_seconds))
 
 
+def jitter_us(rng: RandomGenerator, span_seconds: float = 1.0) -> int:
+    """The offset ``jitter_timestamp`` would add, in integer microseconds."""
+    return seconds_to_us(rng.uniform(0, span_seconds))
+
+
+def csv_output_path(filepath: str, zipped: bool = False) -> str:
+    """Path a ``CsvWriter`` for ``filepath`` actually writes to."""
+    return filepath + ZIP_PART_SUFFIX if zipped else filepath
+
+
+def table_output_path(filepath: str, zipped: bool = False, output_format: str = "csv") -> str:
+    """Path the writer returned by ``open_table_writer`` actually writes to."""
+    if output_format == "parquet":
+        return os.path.splitext(filepath)[0] + ".parquet"
+    return csv_output_path(filepath, zipped)
+
+
 class CsvWriter:
-    """Simple CSV writer that always emits headers and supports streaming writes."""
+    """Simple CSV writer that always emits headers and supports streaming writes.
 
-    def __init__(self, filepath: str, headers: Sequence[str]) -> None:
+    Rows passed to ``write_row`` are buffered and handed to ``csv.writer.writerows`` every
+    ``CSV_BUFFER_ROWS`` rows. With ``zipped=True`` rows are deflated straight into a single-member
+    zip written to ``filepath + ZIP_PART_SUFFIX`` instead of a plain CSV; ``package_zip`` merges the parts.
+    """
+
+    def __init__(self, filepath: str, headers: Sequence[str], zipped: bool = False) -> None:
         ensure_dir(os.path.dirname(filepath))
-        self._fh = open(filepath, "w", newline="", encoding="utf-8")
+        self.path = csv_output_path(filepath, zipped)
+        self._zip: Optional[zipfile.ZipFile] = None
+        self._fh: TextIO
+        if zipped:
+            self._zip = zipfile.ZipFile(self.path, "w", compression=zipfile.ZIP_DEFLATED)
+            # Record what ZipFile.write would for a regular file written now, not the 1980 default.
+            zinfo = zipfile.ZipInfo(os.path.basename(filepath), date_time=time.localtime()[:6])
+            zinfo.compress_type = zipfile.ZIP_DEFLATED
+            zinfo.external_attr = (stat.S_IFREG | 0o644) << 16
+            member = self._zip.open(zinfo, "w", force_zip64=True)
+            buffered = io.BufferedWriter(member, buffer_size=CSV_FILE_BUFFER_BYTES)
+            self._fh = io.TextIOWrapper(buffered, encoding="utf-8", newline="")
+        else:
+            # Large buffers keep write() syscalls rare on multi-million-row tables.
+            self._fh = open(filepath, "w", newline="", encoding="utf-8", buffering=CSV_FILE_BUFFER_BYTES)
         self._writer = csv.writer(self._fh)
         self._writer.writerow(headers)
-
-    def write_row(self, row: Sequence) -> None:
-        self._writer.writerow(row)
+        self._pending: List[Sequence[object]] = []
+
+    def write_row(self, row: Sequence[object]) -> None:
+        pending = self._pending
+        pending.append(row)
+        if len(pending) >= CSV_BUFFER_ROWS:
+            self.flush()
+
+    def write_rows(self, rows: Iterable[Sequence[object]]) -> None:
+        """Write ``rows`` immediately; the caller may clear and reuse the container afterwards."""
+        if self._pending:
+            self.flush()
+        self._writer.writerows(rows)
+
+    def write_raw(self, text: str) -> None:
+        """Write pre-formatted CSV lines verbatim, bypassing ``csv.writer`` quoting.
+
+        Only for rows whose fields can never need quoting; lines must end with
+        ``CSV_LINE_TERMINATOR`` to match rows written through ``csv.writer``.
+        """
+        if self._pending:
+            self.flush()
+        self._fh.write(text)
+
+    def write_formatted(self, rows: Iterable[Row], line_format: str) -> None:
+        """Write ``rows`` as ``line_format % row`` lines, bypassing ``csv.writer``.
+
+        For tables whose fields are ids, fixed labels, ISO timestamps and numbers, none of which can
+        contain a delimiter or quote, formatting whole lines is much cheaper than ``csv.writer``.
+        ``line_format`` must end with ``CSV_LINE_TERMINATOR`` and render floats with ``%r``, which
+        matches what ``csv.writer`` emits. Other sinks accept the same call and write ``rows`` as-is.
+        """
+        self.write_raw("".join([line_format % row for row in rows]))
+
+    def flush(self) -> None:
+        self._writer.writerows(self._pending)
+        self._pending.clear()
 
     def close(self) -> None:
+        self.flush()
         self._fh.close()
+        if self._zip:
+            self._zip.close()
+
+
+def _import_optional(name: str) -> Any:
+    """Import an optional dependency at first use, typed as ``Any``.
 
+    pyarrow ships without type information, so it is not imported statically; that keeps mypy
+    (and the mypyc build of this module) independent of whether it is installed.
+    """
+    return importlib.import_module(name)
 
-@dataclass
+
+class ParquetSink:
+    """Parquet counterpart of ``CsvWriter`` backed by ``pyarrow.parquet.ParquetWriter``.
+
+    Rows are accumulated per column and written as ZSTD row groups of ``PARQUET_ROW_GROUP_ROWS``.
+    The file schema is fixed up front by ``parquet_schema(headers)``, so every row group is built
+    with the same column types whatever values it happens to hold. Empty strings become nulls. The
+    file is written next to ``filepath`` with a ``.parquet`` extension.
+    """
+
+    def __init__(self, filepath: str, headers: Sequence[str]) -> None:
+        pa = _import_optional("pyarrow")
+        pq = _import_optional("pyarrow.parquet")
+
+        ensure_dir(os.path.dirname(filepath))
+        self._pa = pa
+        self.path = table_output_path(filepath, output_format="parquet")
+        self._schema = parquet_schema(headers)
+        self._columns: List[List[object]] = [[] for _ in self._schema]
+        self._writer = pq.ParquetWriter(self.path, self._schema, compression="zstd")
+
+    def write_row(self, row: Sequence[object]) -> None:
+        for column, value in zip(self._columns, row):
+            column.append(None if value == "" else value)
+        if len(self._columns[0]) >= PARQUET_ROW_GROUP_ROWS:
+            self.flush()
+
+    def write_rows(self, rows: Iterable[Sequence[object]]) -> None:
+        """Copy ``rows`` into the column buffers; the caller may clear and reuse the container."""
+        for row in rows:
+            self.write_row(row)
+
+    def write_formatted(self, rows: Iterable[Row], line_format: str) -> None:
+        """``CsvWriter.write_formatted`` counterpart; Parquet stores the row values directly."""
+        self.write_rows(rows)
+
+    def _column_array(self, arrow_type: Any, values: List[object]) -> Any:
+        pa = self._pa
+        if pa.types.is_timestamp(arrow_type):
+            return pa.array(values, type=pa.string()).cast(arrow_type)
+        if pa.types.is_dictionary(arrow_type):
+            return pa.array(values, type=arrow_type.value_type).dictionary_encode()
+        return pa.array(values, type=arrow_type)
+
+    def flush(self) -> None:
+        if not self._columns[0]:
+            return
+        schema = self._schema
+        arrays = [self._column_array(arrow_field.type, values) for arrow_field, values in zip(schema, self._columns)]
+        self._writer.write_batch(self._pa.RecordBatch.from_arrays(arrays, schema=schema))
+        for column in self._columns:
+            column.clear()
+
+    def close(self) -> None:
+        self.flush()
+        self._writer.close()
+
+
+def parquet_schema(headers: Sequence[str]) -> Any:
+    """Arrow schema for a table with ``headers``, typed from the ``PARQUET_*_COLUMNS`` sets.
+
+    Timestamps are ``timestamp('ns', 'UTC')``, numeric columns are int64/float64, low-cardinality
+    labels are dictionary-encoded strings and every other column is a nullable string.
+    """
+    pa = _import_optional("pyarrow")
+
+    fields = []
+    for name in headers:
+        if name in PARQUET_TIMESTAMP_COLUMNS:
+            arrow_type = pa.timestamp("ns", tz="UTC")
+        elif name in PARQUET_INT_COLUMNS:
+            arrow_type = pa.int64()
+        elif name in PARQUET_FLOAT_COLUMNS:
+            arrow_type = pa.float64()
+        elif name in PARQUET_DICTIONARY_COLUMNS:
+            arrow_type = pa.dictionary(pa.int32(), pa.string())
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(name, arrow_type))
+    return pa.schema(fields)
+
+
+TableWriter = Union[CsvWriter, ParquetSink]
+
+
+def open_table_writer(
+    filepath: str, headers: Sequence[str], zipped: bool = False, output_format: str = "csv"
+) -> TableWriter:
+    """Return the writer for ``output_format``; ``zipped`` only applies to CSV output."""
+    if output_format == "parquet":
+        return ParquetSink(filepath, headers)
+    return CsvWriter(filepath, headers, zipped)
+
+
+def write_table_to_path(
+    write_table: Callable[..., T],
+    filepath: str,
+    headers: Sequence[str],
+    seed: int,
+    *args: Any,
+    zipped: bool = False,
+    output_format: str = "csv",
+    **kwargs: Any,
+) -> Tuple[T, str]:
+    """Run ``write_table(writer, RandomGenerator(seed), *args, **kwargs)`` on a fresh writer for ``filepath``.
+
+    Takes only picklable arguments, so a table can be generated in a worker process. Returns the
+    ``write_table`` result and the path of the file actually written.
+    """
+    writer = open_table_writer(filepath, headers, zipped, output_format)
+    result = write_table(writer, RandomGenerator(seed), *args, **kwargs)
+    writer.close()
+    return result, writer.path
+
+
+@dataclass(slots=True)
 class DatasetConfig:
     output_dir: str
     data_dir: str
@@ -178,6 +648,10 @@ class DatasetConfig:
     app_log_rows: int
     enable_tier2: bool
     zip_output: bool
+    stream_zip: bool = False
+    zip_backend: str = "zlib"
+    output_format: str = "csv"
+    workers: int = 3
     avg_logs_per_txn: int = 10
     min_transactions: int = 500
 
@@ -187,12 +661,17 @@ class DatasetConfig:
         return max(self.min_transactions, target)
 
 
-@dataclass
+@dataclass(slots=True)
 class RowCounter:
-    counts: Dict[str, int]
+    counts: DefaultDict[str, int] = field(default_factory=lambda: defaultdict(int))
 
     def increment(self, table: str, amount: int = 1) -> None:
-        self.counts[table] = self.counts.get(table, 0) + amount
+        self.counts[table] += amount
+
+    def increment_many(self, amounts: Mapping[str, int]) -> None:
+        counts = self.counts
+        for table, amount in amounts.items():
+            counts[table] += amount
 
     def get(self, table: str) -> int:
         return self.counts.get(table, 0)
@@ -205,17 +684,43 @@ __all__ = [
     "daterange_minutes",
     "daterange_5m",
     "isoformat",
+    "isoformat_ms",
+    "isoformat_sec",
+    "compact_timestamp",
     "ensure_dir",
     "diurnal_factor",
     "heavy_tail_latency",
     "generate_incident_bursts",
     "in_any_window",
+    "WindowIndex",
     "minutes_between",
     "CsvWriter",
+    "CSV_LINE_TERMINATOR",
+    "Row",
+    "OUTPUT_FORMATS",
+    "ParquetSink",
+    "parquet_schema",
+    "TableWriter",
+    "open_table_writer",
+    "write_table_to_path",
+    "table_output_path",
+    "WRITE_BATCH_ROWS",
+    "csv_output_path",
     "DatasetConfig",
     "RowCounter",
     "START_TS",
     "END_TS",
     "DATASET_NAME",
+    "ZIP_PART_SUFFIX",
     "jitter_timestamp",
+    "jitter_us",
+    "EPOCH",
+    "US_PER_MINUTE",
+    "to_epoch_us",
+    "from_epoch_us",
+    "ms_to_us",
+    "seconds_to_us",
+    "isoformat_us",
+    "isoformat_sec_us",
+    "compact_timestamp_us",
 ]
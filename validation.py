@@ -5,7 +5,7 @@ from dataclasses import dataclass, field
 from typing import Dict, List
 
 
-@dataclass
+@dataclass(slots=True)
 class ValidationResult:
     referential_integrity: Dict[str, float] = field(default_factory=dict)
     incident_coherence: Dict[str, float] = field(default_factory=dict)